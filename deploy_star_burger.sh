@@ -8,6 +8,11 @@ npm ci --dev
 python3 manage.py collectstatic --noinput
 python3 manage.py migrate --noinput
 systemctl restart starburger
+if systemctl cat starburger-geocoder >/dev/null 2>&1; then
+    systemctl restart starburger-geocoder
+else
+    echo "starburger-geocoder.service is not installed, see README"
+fi
 systemctl reload nginx
 
 export $(xargs <.env)
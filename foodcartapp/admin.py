@@ -1,17 +1,70 @@
+import json
+
 from django.contrib import admin
+from django.contrib.admin.widgets import AutocompleteSelect
+from django.core.paginator import Paginator
+from django.db import connections
 from django.shortcuts import reverse, redirect
 from django.templatetags.static import static
+from django.utils.functional import cached_property
 from django.utils.html import format_html
 from django.utils.http import url_has_allowed_host_and_scheme
+from phonenumber_field.phonenumber import PhoneNumber, to_python
 from star_burger.settings import ALLOWED_HOSTS
 
+from .models import Banner
 from .models import Product
 from .models import ProductCategory
 from .models import Restaurant
 from .models import RestaurantMenuItem
+from .models import ArchivedOrder
+from .models import ArchivedOrderElement
 from .models import Order
 from .models import OrderElement
 from .models import Location
+from .models import GeocodingTask
+from .product_search import filter_products
+
+
+EXACT_COUNT_THRESHOLD = 10000
+
+
+class EstimatedCountPaginator(Paginator):
+    @cached_property
+    def count(self):
+        connection = connections[self.object_list.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+        sql, params = self.object_list.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        estimated_count = plan[0]['Plan']['Plan Rows']
+        if estimated_count < EXACT_COUNT_THRESHOLD:
+            return super().count
+        return estimated_count
+
+
+class PreloadedAutocompleteSelect(AutocompleteSelect):
+    selected_object = None
+
+    def optgroups(self, name, value, attr=None):
+        selected_values = [str(item) for item in value if item]
+        if self.selected_object is None \
+                or selected_values != [str(self.selected_object.pk)]:
+            return super().optgroups(name, value, attr)
+        groups = super().optgroups(name, [], attr)
+        options = groups[0][1]
+        options.append(self.create_option(
+            name,
+            self.selected_object.pk,
+            str(self.selected_object),
+            True,
+            len(options)
+        ))
+        return groups
 
 
 class RestaurantMenuItemInline(admin.TabularInline):
@@ -24,21 +77,26 @@ class OrderElementsInline(admin.TabularInline):
     fields = ['show_preview', 'quantity']
     readonly_fields = ['show_preview']
     extra = 0
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related(
+            'order',
+            'product'
+        )
+
     def show_preview(self, obj):
         return format_html(
             '<img style="max-height:{height}" src="{url}"/>',
             height='200px',
-            url=obj.product.image.url
+            url=obj.product.preview_url
         )
 
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
     search_fields = [
-        'firstname',
-        'phonenumber',
-        'adress',
-        'status'
+        '^firstname',
+        'address',
     ]
     list_display = [
         'firstname',
@@ -53,9 +111,55 @@ class OrderAdmin(admin.ModelAdmin):
         'payment',
         'restaurant'
     ]
+    list_filter = [
+        'status',
+        'payment',
+    ]
+    list_select_related = [
+        'restaurant'
+    ]
+    autocomplete_fields = [
+        'restaurant'
+    ]
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    readonly_fields = [
+        'total_price'
+    ]
     inlines = [
         OrderElementsInline
     ]
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        if db_field.name == 'restaurant':
+            kwargs['widget'] = PreloadedAutocompleteSelect(
+                db_field,
+                self.admin_site,
+                using=kwargs.get('using')
+            )
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
+
+    def get_changelist_formset(self, request, **kwargs):
+        formset = super().get_changelist_formset(request, **kwargs)
+
+        class OrderChangeListFormSet(formset):
+            def _construct_form(self, i, **kwargs):
+                form = super()._construct_form(i, **kwargs)
+                form.fields['restaurant'].widget.widget.selected_object = \
+                    form.instance.restaurant
+                return form
+
+        return OrderChangeListFormSet
+
+    def get_search_results(self, request, queryset, search_term):
+        phonenumber = to_python(search_term, region='RU')
+        if isinstance(phonenumber, PhoneNumber) and phonenumber.is_valid():
+            return queryset.filter(phonenumber=phonenumber), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        form.instance.update_total_price()
     
     def response_change(self, request, obj):
         response = super().response_change(request, obj)
@@ -69,6 +173,42 @@ class OrderAdmin(admin.ModelAdmin):
             return response
 
 
+class ArchivedOrderElementInline(admin.TabularInline):
+    model = ArchivedOrderElement
+    fields = ['product', 'quantity', 'price']
+    readonly_fields = ['product', 'quantity', 'price']
+    extra = 0
+    can_delete = False
+
+
+@admin.register(ArchivedOrder)
+class ArchivedOrderAdmin(admin.ModelAdmin):
+    search_fields = [
+        'id',
+        'phonenumber',
+    ]
+    list_display = [
+        'id',
+        'firstname',
+        'lastname',
+        'phonenumber',
+        'created_time',
+        'total_price',
+    ]
+    list_select_related = [
+        'restaurant'
+    ]
+    inlines = [
+        ArchivedOrderElementInline
+    ]
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
 @admin.register(Restaurant)
 class RestaurantAdmin(admin.ModelAdmin):
     search_fields = [
@@ -101,8 +241,6 @@ class ProductAdmin(admin.ModelAdmin):
         'category',
     ]
     search_fields = [
-        # FIXME SQLite can not convert letter case for cyrillic words properly, so search will be buggy.
-        # Migration to PostgreSQL is necessary
         'name',
         'category__name',
     ]
@@ -142,17 +280,22 @@ class ProductAdmin(admin.ModelAdmin):
             )
         }
 
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return filter_products(queryset, search_term), False
+
     def get_image_preview(self, obj):
         if not obj.image:
             return 'выберите картинку'
-        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.image.url)
+        return format_html('<img src="{url}" style="max-height: 200px;"/>', url=obj.preview_url)
     get_image_preview.short_description = 'превью'
 
     def get_image_list_preview(self, obj):
         if not obj.image or not obj.id:
             return 'нет картинки'
         edit_url = reverse('admin:foodcartapp_product_change', args=(obj.id,))
-        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.image.url)
+        return format_html('<a href="{edit_url}"><img src="{src}" style="max-height: 50px;"/></a>', edit_url=edit_url, src=obj.preview_url)
     get_image_list_preview.short_description = 'превью'
 
 
@@ -161,9 +304,30 @@ class ProductAdmin(admin.ModelAdmin):
     pass
 
 
+@admin.register(Banner)
+class BannerAdmin(admin.ModelAdmin):
+    list_display = [
+        'title',
+        'text',
+        'position',
+    ]
+    list_editable = [
+        'position',
+    ]
+
+
 @admin.register(Location)
 class LocationAdmin(admin.ModelAdmin):
     list_display = [
         'address',
         'created_at'
     ]
+
+
+@admin.register(GeocodingTask)
+class GeocodingTaskAdmin(admin.ModelAdmin):
+    list_display = [
+        'address',
+        'attempts',
+        'scheduled_at'
+    ]
@@ -0,0 +1,57 @@
+from django.core.cache import cache
+
+from star_burger.db_router import primary_reads
+
+from .cache_versions import get_cache_version
+from .models import RestaurantMenuItem
+
+
+AVAILABILITY_INDEX_CACHE_KEY = 'restaurant-availability-index'
+
+
+class AvailabilityIndex:
+    def __init__(self, version, menu):
+        self.version = version
+        self.restaurants_ids = sorted({restaurant for _, restaurant in menu})
+        restaurants_bits = {
+            restaurant: 1 << position
+            for position, restaurant in enumerate(self.restaurants_ids)
+        }
+        self.products_restaurants = {}
+        for product, restaurant in menu:
+            self.products_restaurants[product] = \
+                self.products_restaurants.get(product, 0) \
+                | restaurants_bits[restaurant]
+
+    @classmethod
+    def build(cls, version):
+        menu = list(
+            RestaurantMenuItem.objects
+            .filter(availability=True)
+            .values_list('product', 'restaurant')
+        )
+        return cls(version, menu)
+
+    def find_restaurants(self, products_ids):
+        products_ids = set(products_ids)
+        if not products_ids:
+            return set()
+        restaurants_bitset = -1
+        for product_id in products_ids:
+            restaurants_bitset &= self.products_restaurants.get(product_id, 0)
+        restaurants = set()
+        while restaurants_bitset:
+            lowest_bit = restaurants_bitset & -restaurants_bitset
+            restaurants.add(self.restaurants_ids[lowest_bit.bit_length() - 1])
+            restaurants_bitset ^= lowest_bit
+        return restaurants
+
+
+def get_availability_index():
+    version = get_cache_version('menu')
+    index = cache.get(AVAILABILITY_INDEX_CACHE_KEY)
+    if index is None or index.version != version:
+        with primary_reads():
+            index = AvailabilityIndex.build(version)
+        cache.set(AVAILABILITY_INDEX_CACHE_KEY, index, None)
+    return index
@@ -0,0 +1,19 @@
+from uuid import uuid4
+
+from django.core.cache import cache
+
+
+def get_cache_version(name):
+    version_key = f'cache-version:{name}'
+    version = cache.get(version_key)
+    if version is None:
+        version = uuid4().hex
+        cache.set(version_key, version, None)
+    return version
+
+
+def bump_cache_version(*names):
+    cache.set_many(
+        {f'cache-version:{name}': uuid4().hex for name in names},
+        None
+    )
@@ -1,18 +1,160 @@
+import hashlib
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+
+import numpy as np
 import requests
+from django.core.cache import cache
+from geopy import distance
+from requests.adapters import HTTPAdapter
+
+from star_burger.metrics import observe_geocoder_request
+
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+
 
+class RateLimiter:
+    def __init__(self, requests_per_second):
+        self.interval = 1 / requests_per_second
+        self.next_request_time = time.monotonic()
+        self.lock = threading.Lock()
 
-def fetch_coordinates(apikey, place):
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_request_time - now
+            self.next_request_time = max(now, self.next_request_time) \
+                + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class MalformedGeocoderResponse(requests.RequestException):
+    pass
+
+
+def fetch_coordinates(apikey, place, session=requests):
     base_url = "https://geocode-maps.yandex.ru/1.x"
     params = {"geocode": place, "apikey": apikey, "format": "json"}
-    response = requests.get(base_url, params=params)
-    response.raise_for_status()
-    found_places = response.json()['response']['GeoObjectCollection']['featureMember']
-    if found_places:
-        most_relevant = found_places[0]
-        lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
-        return {
-            'longitude': float(lon),
-            'latitude': float(lat)
+    started_at = time.perf_counter()
+    try:
+        response = session.get(base_url, params=params)
+        response.raise_for_status()
+        found_places = response.json()['response']['GeoObjectCollection']['featureMember']
+        if found_places:
+            most_relevant = found_places[0]
+            lon, lat = most_relevant['GeoObject']['Point']['pos'].split(" ")
+            coordinates = {
+                'longitude': float(lon),
+                'latitude': float(lat)
+            }
+        else:
+            coordinates = None
+    except requests.RequestException:
+        observe_geocoder_request(time.perf_counter() - started_at, 'error')
+        raise
+    except (KeyError, IndexError, TypeError, ValueError) as error:
+        observe_geocoder_request(time.perf_counter() - started_at, 'error')
+        raise MalformedGeocoderResponse(
+            f'Unexpected geocoder response: {error!r}',
+            response=response
+        ) from error
+    observe_geocoder_request(
+        time.perf_counter() - started_at,
+        'found' if coordinates else 'not_found'
+    )
+    return coordinates
+
+
+def fetch_coordinates_bulk(apikey, places, max_workers, rate_limit):
+    rate_limiter = RateLimiter(rate_limit)
+
+    def fetch_place(session, place):
+        rate_limiter.wait()
+        return fetch_coordinates(apikey, place, session=session)
+
+    found_coordinates = {}
+    with requests.Session() as session, \
+            ThreadPoolExecutor(max_workers=max_workers) as executor:
+        adapter = HTTPAdapter(pool_maxsize=max_workers)
+        session.mount('https://', adapter)
+        futures = {
+            executor.submit(fetch_place, session, place): place
+            for place in set(places)
         }
-    else:
-        return None
+        for future in as_completed(futures):
+            place = futures[future]
+            try:
+                found_coordinates[place] = future.result()
+            except requests.RequestException as error:
+                logger.warning('Geocoding of %r failed: %s', place, error)
+    return found_coordinates
+
+
+def normalize_address(address):
+    words = address.lower().replace('ё', 'е').split()
+    return ' '.join(words).replace(' ,', ',')
+
+
+@contextmanager
+def geocoding_locks(addresses, timeout):
+    locks_keys = {
+        address: 'geocoding-lock:{}'.format(
+            hashlib.md5(address.encode()).hexdigest()
+        ) for address in addresses
+    }
+    locked_addresses = {
+        address for address, lock_key in locks_keys.items()
+        if cache.add(lock_key, True, timeout)
+    }
+    try:
+        yield locked_addresses
+    finally:
+        cache.delete_many(
+            [locks_keys[address] for address in locked_addresses]
+        )
+
+
+def calculate_distance_matrix(origins, destinations):
+    origins = np.radians(np.asarray(origins, dtype=float).reshape(-1, 2))
+    destinations = np.radians(
+        np.asarray(destinations, dtype=float).reshape(-1, 2)
+    )
+    origins_lat = origins[:, 0, np.newaxis]
+    origins_lon = origins[:, 1, np.newaxis]
+    destinations_lat = destinations[np.newaxis, :, 0]
+    destinations_lon = destinations[np.newaxis, :, 1]
+    haversine = (
+        np.sin((destinations_lat - origins_lat) / 2) ** 2
+        + np.cos(origins_lat) * np.cos(destinations_lat)
+        * np.sin((destinations_lon - origins_lon) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(haversine, 0, 1)))
+
+
+def rank_destinations(origins, destinations, allowed=None, geodesic_top_k=0):
+    distances = calculate_distance_matrix(origins, destinations)
+    if allowed is not None:
+        distances = np.where(allowed, distances, np.inf)
+    rankings = []
+    for origin, origin_distances in zip(origins, distances.tolist()):
+        nearest_first = np.argsort(origin_distances, kind='stable')
+        ranking = [
+            (index, origin_distances[index])
+            for index in nearest_first.tolist()
+            if origin_distances[index] != np.inf
+        ]
+        if geodesic_top_k:
+            ranking[:geodesic_top_k] = [
+                (index, distance.distance(origin, destinations[index]).km)
+                for index, _ in ranking[:geodesic_top_k]
+            ]
+            ranking.sort(key=lambda ranked: ranked[1])
+        rankings.append(ranking)
+    return rankings
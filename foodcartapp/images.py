@@ -0,0 +1,96 @@
+import hashlib
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection
+from PIL import Image, ImageOps
+
+from .cache_versions import bump_cache_version
+from .models import Product
+from star_burger.settings import PRODUCT_THUMBNAIL_SIZE
+
+
+logger = logging.getLogger(__name__)
+
+image_variants_executor = ThreadPoolExecutor(max_workers=1)
+
+
+def save_image(image, name, format, **options):
+    if default_storage.exists(name):
+        return name
+    content = BytesIO()
+    image.save(content, format=format, **options)
+    return default_storage.save(name, ContentFile(content.getvalue()))
+
+
+def generate_image_variants(product):
+    if not product.image:
+        return False
+    with product.image.open('rb') as image_file:
+        image_content = image_file.read()
+    image_hash = hashlib.sha256(image_content).hexdigest()
+    if image_hash == product.image_hash:
+        return False
+
+    name_prefix = f'variants/{image_hash[:32]}'
+    image = ImageOps.exif_transpose(Image.open(BytesIO(image_content)))
+    thumbnail = image.copy()
+    thumbnail.thumbnail((PRODUCT_THUMBNAIL_SIZE, PRODUCT_THUMBNAIL_SIZE))
+    if thumbnail.mode in ('RGBA', 'LA', 'P'):
+        thumbnail_name = save_image(
+            thumbnail,
+            f'{name_prefix}_thumbnail.png',
+            'PNG',
+            optimize=True
+        )
+    else:
+        thumbnail_name = save_image(
+            thumbnail.convert('RGB'),
+            f'{name_prefix}_thumbnail.jpg',
+            'JPEG',
+            quality=85,
+            optimize=True
+        )
+    variants = {
+        'image_hash': image_hash,
+        'thumbnail': thumbnail_name,
+        'thumbnail_webp': save_image(
+            thumbnail,
+            f'{name_prefix}_thumbnail.webp',
+            'WEBP',
+            quality=80
+        ),
+        'image_webp': save_image(
+            image,
+            f'{name_prefix}.webp',
+            'WEBP',
+            quality=80
+        ),
+    }
+    updated_count = Product.objects.filter(
+        pk=product.pk,
+        image=product.image.name
+    ).update(**variants)
+    if not updated_count:
+        return False
+    bump_cache_version('catalog')
+    return True
+
+
+def generate_image_variants_in_background(product_id):
+    def generate():
+        try:
+            product = Product.objects.filter(pk=product_id).first()
+            if product:
+                generate_image_variants(product)
+        except Exception:
+            logger.exception(
+                'Could not generate image variants of product %s', product_id
+            )
+        finally:
+            connection.close()
+
+    image_variants_executor.submit(generate)
@@ -0,0 +1,284 @@
+from datetime import timedelta
+from decimal import Decimal
+from itertools import islice
+
+from django.core.management.color import no_style
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .cache_versions import bump_cache_version
+from .geo_utils import normalize_address
+from .models import (
+    Location,
+    Order,
+    OrderElement,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem
+)
+
+
+CITY_CENTER = (55.75, 37.62)
+CITY_RADIUS_DEGREES = 0.25
+OPEN_ORDERS_PERIOD = timedelta(days=1)
+OPEN_STATUSES = [
+    Order.OrderStatusChoice.CREATED,
+    Order.OrderStatusChoice.ACCEPTED,
+    Order.OrderStatusChoice.PREPAIRING,
+    Order.OrderStatusChoice.DELIVERY,
+]
+PRODUCT_KINDS = ['Бургер', 'Чизбургер', 'Ролл', 'Салат', 'Суп', 'Коктейль']
+PRODUCT_FLAVOURS = [
+    'с говядиной',
+    'с курицей',
+    'с сыром',
+    'с беконом',
+    'с грибами',
+    'острый',
+    'двойной',
+    'вегетарианский',
+]
+
+
+def get_next_id(model):
+    return (model.objects.aggregate(max_id=Max('id'))['max_id'] or 0) + 1
+
+
+def save_in_batches(model, objects, batch_size):
+    objects = iter(objects)
+    saved_count = 0
+    for batch in iter(lambda: list(islice(objects, batch_size)), []):
+        model.objects.bulk_create(batch)
+        saved_count += len(batch)
+    return saved_count
+
+
+def reset_sequences(*models):
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), models):
+            cursor.execute(sql)
+
+
+def generate_point(randomizer):
+    latitude, longitude = CITY_CENTER
+    return (
+        latitude + randomizer.uniform(-1, 1) * CITY_RADIUS_DEGREES,
+        longitude + randomizer.uniform(-1, 1) * CITY_RADIUS_DEGREES * 2,
+    )
+
+
+def generate_address(number):
+    return f'Москва, улица Нагрузочная {number // 100}, дом {number % 100 + 1}'
+
+
+def generate_restaurant_address(restaurant_id):
+    return f'Москва, ресторан Star Burger {restaurant_id}'
+
+
+def generate_restaurants(randomizer, first_id, count):
+    for restaurant_id in range(first_id, first_id + count):
+        yield Restaurant(
+            id=restaurant_id,
+            name=f'Star Burger {restaurant_id}',
+            address=generate_restaurant_address(restaurant_id),
+            contact_phone=f'+7900{randomizer.randrange(10 ** 7):07d}'
+        )
+
+
+def generate_products(randomizer, first_id, count, categories):
+    for product_id in range(first_id, first_id + count):
+        yield Product(
+            id=product_id,
+            name=f'{randomizer.choice(PRODUCT_KINDS)} '
+                 f'{randomizer.choice(PRODUCT_FLAVOURS)} {product_id}',
+            category=randomizer.choice(categories),
+            description=', '.join(randomizer.sample(PRODUCT_FLAVOURS, 3)),
+            price=Decimal(randomizer.randrange(10000, 100000)) / 100,
+            image=f'load_data/product{product_id}.jpg',
+            special_status=randomizer.random() < 0.1
+        )
+
+
+def generate_menu_items(
+    randomizer,
+    restaurants_ids,
+    products_ids,
+    products_per_restaurant
+):
+    for restaurant_id in restaurants_ids:
+        for product_id in randomizer.sample(products_ids, products_per_restaurant):
+            yield RestaurantMenuItem(
+                restaurant_id=restaurant_id,
+                product_id=product_id,
+                availability=randomizer.random() < 0.9
+            )
+
+
+def generate_locations(randomizer, addresses):
+    today = timezone.now().date()
+    for address in addresses:
+        latitude, longitude = generate_point(randomizer)
+        yield Location(
+            address=normalize_address(address),
+            latitude=latitude,
+            longitude=longitude,
+            created_at=today
+        )
+
+
+def generate_orders_with_elements(
+    randomizer,
+    first_id,
+    count,
+    addresses,
+    restaurants_ids,
+    products_prices,
+    days
+):
+    now = timezone.now()
+    products_ids = list(products_prices)
+    for order_id in range(first_id, first_id + count):
+        created_time = now - timedelta(seconds=randomizer.uniform(0, days * 86400))
+        if now - created_time > OPEN_ORDERS_PERIOD:
+            status = Order.OrderStatusChoice.DONE
+        else:
+            status = randomizer.choice(OPEN_STATUSES)
+        has_restaurant = status not in (
+            Order.OrderStatusChoice.CREATED,
+            Order.OrderStatusChoice.ACCEPTED
+        )
+        elements = [
+            OrderElement(
+                order_id=order_id,
+                product_id=product_id,
+                quantity=randomizer.randint(1, 3),
+                price=products_prices[product_id]
+            )
+            for product_id in randomizer.sample(
+                products_ids,
+                min(len(products_ids), randomizer.randint(1, 5))
+            )
+        ]
+        order = Order(
+            id=order_id,
+            firstname=f'Клиент {order_id}',
+            lastname='Нагрузочный',
+            phonenumber=f'+7900{randomizer.randrange(10 ** 7):07d}',
+            address=randomizer.choice(addresses),
+            status=status,
+            payment=randomizer.choice(Order.OrderPaymentChoice.values),
+            created_time=created_time,
+            restaurant_id=randomizer.choice(restaurants_ids)
+            if has_restaurant else None,
+            total_price=sum(
+                element.price * element.quantity for element in elements
+            )
+        )
+        yield order, elements
+
+
+def save_orders_with_elements(orders_with_elements, batch_size):
+    saved_count = 0
+    for batch in iter(lambda: list(islice(orders_with_elements, batch_size)), []):
+        with transaction.atomic():
+            Order.objects.bulk_create(order for order, _ in batch)
+            OrderElement.objects.bulk_create(
+                element for _, elements in batch for element in elements
+            )
+        saved_count += len(batch)
+    return saved_count
+
+
+def generate_load_data(
+    randomizer,
+    restaurants_count,
+    products_count,
+    products_per_restaurant,
+    addresses_count,
+    orders_count,
+    days=365,
+    batch_size=5000
+):
+    categories = [
+        ProductCategory.objects.get_or_create(name=name)[0]
+        for name in ('Бургеры', 'Напитки', 'Десерты')
+    ]
+    first_restaurant_id = get_next_id(Restaurant)
+    save_in_batches(
+        Restaurant,
+        generate_restaurants(randomizer, first_restaurant_id, restaurants_count),
+        batch_size
+    )
+    first_product_id = get_next_id(Product)
+    save_in_batches(
+        Product,
+        generate_products(
+            randomizer,
+            first_product_id,
+            products_count,
+            categories
+        ),
+        batch_size
+    )
+    Product.objects.filter(id__gte=first_product_id).update_search_vector()
+    restaurants_ids = list(
+        range(first_restaurant_id, first_restaurant_id + restaurants_count)
+    )
+    products_prices = dict(
+        Product.objects
+        .filter(id__gte=first_product_id)
+        .values_list('id', 'price')
+    )
+    save_in_batches(
+        RestaurantMenuItem,
+        generate_menu_items(
+            randomizer,
+            restaurants_ids,
+            list(products_prices),
+            min(products_per_restaurant, products_count)
+        ),
+        batch_size
+    )
+
+    addresses = [generate_address(number) for number in range(addresses_count)]
+    known_addresses = set(
+        Location.objects.values_list('address', flat=True)
+    )
+    save_in_batches(
+        Location,
+        generate_locations(
+            randomizer,
+            [
+                address for address in addresses + [
+                    generate_restaurant_address(restaurant_id)
+                    for restaurant_id in restaurants_ids
+                ]
+                if normalize_address(address) not in known_addresses
+            ]
+        ),
+        batch_size
+    )
+
+    first_order_id = get_next_id(Order)
+    save_orders_with_elements(
+        generate_orders_with_elements(
+            randomizer,
+            first_order_id,
+            orders_count,
+            addresses,
+            restaurants_ids,
+            products_prices,
+            days
+        ),
+        batch_size
+    )
+    reset_sequences(Restaurant, Product, Order)
+    bump_cache_version(
+        'catalog',
+        'products',
+        'menu',
+        'restaurants',
+        'locations'
+    )
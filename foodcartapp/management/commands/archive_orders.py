@@ -0,0 +1,54 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from foodcartapp.models import Order
+
+
+class Command(BaseCommand):
+    help = 'Переносит старые выполненные заказы в архивные таблицы'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=30,
+            help='Архивировать выполненные заказы старше стольких дней'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько заказов переносить в одной транзакции'
+        )
+        parser.add_argument(
+            '--pause',
+            type=float,
+            default=0,
+            help='Пауза в секундах между транзакциями'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        archived_count = 0
+        while True:
+            with transaction.atomic():
+                orders_ids = list(
+                    Order.objects
+                    .filter(
+                        status=Order.OrderStatusChoice.DONE,
+                        created_time__lt=cutoff
+                    )
+                    .select_for_update(skip_locked=True)
+                    .order_by('id')
+                    .values_list('id', flat=True)[:options['batch_size']]
+                )
+                if not orders_ids:
+                    break
+                archived_count += Order.objects.filter(id__in=orders_ids) \
+                    .archive()
+            time.sleep(options['pause'])
+        self.stdout.write(f'Перенесено в архив заказов: {archived_count}')
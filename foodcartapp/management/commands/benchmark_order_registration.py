@@ -0,0 +1,81 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from foodcartapp.models import Product
+from star_burger.settings import ALLOWED_HOSTS
+
+
+class Command(BaseCommand):
+    help = 'Измеряет время регистрации заказа в зависимости от размера корзины'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--cart-sizes',
+            type=int,
+            nargs='+',
+            default=[1, 10, 50, 100],
+            help='Размеры корзины, для которых измерять время'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Сколько заказов регистрировать для каждого размера корзины'
+        )
+
+    def handle(self, *args, **options):
+        client = Client(HTTP_HOST=ALLOWED_HOSTS[0])
+        self.stdout.write('товаров\tмедиана, мс\tp95, мс\tзапросов к БД')
+        with transaction.atomic():
+            products = self.create_products(max(options['cart_sizes']))
+            for cart_size in options['cart_sizes']:
+                cart = [
+                    {'product': product.id, 'quantity': 1}
+                    for product in products[:cart_size]
+                ]
+                durations = []
+                for number in range(options['repeat']):
+                    order = {
+                        'firstname': 'Иван',
+                        'lastname': 'Петров',
+                        'phonenumber': f'+7900{cart_size:03d}{number:04d}',
+                        'address': 'Москва, Красная площадь, 1',
+                        'products': cart,
+                    }
+                    with CaptureQueriesContext(connection) as queries:
+                        started_at = time.perf_counter()
+                        response = client.post(
+                            '/api/order/',
+                            order,
+                            content_type='application/json',
+                            REMOTE_ADDR=f'10.1.{number // 256 % 256}.'
+                                        f'{number % 256}'
+                        )
+                        durations.append(time.perf_counter() - started_at)
+                    if response.status_code != 201:
+                        raise RuntimeError(response.content)
+                self.stdout.write(
+                    f'{cart_size}\t'
+                    f'{statistics.median(durations) * 1000:.1f}\t'
+                    f'{self.percentile(durations, 95) * 1000:.1f}\t'
+                    f'{len(queries)}'
+                )
+            transaction.set_rollback(True)
+
+    def create_products(self, count):
+        return [
+            Product.objects.create(
+                name=f'Товар для замера {number}',
+                price=100,
+                image='benchmark.jpg'
+            ) for number in range(count)
+        ]
+
+    def percentile(self, values, percent):
+        values = sorted(values)
+        return values[min(len(values) - 1, len(values) * percent // 100)]
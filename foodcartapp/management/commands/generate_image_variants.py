@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from foodcartapp.images import generate_image_variants
+from foodcartapp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Создаёт миниатюры и WebP-версии картинок товаров'
+
+    def handle(self, *args, **options):
+        generated_count = 0
+        for product in Product.objects.exclude(image='').iterator():
+            try:
+                generated = generate_image_variants(product)
+            except (OSError, ValueError) as error:
+                self.stderr.write(f'{product}: {error}')
+                continue
+            generated_count += generated
+        self.stdout.write(f'Обновлены картинки товаров: {generated_count}')
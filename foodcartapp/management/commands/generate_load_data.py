@@ -0,0 +1,55 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foodcartapp.load_data import generate_load_data
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу данных большим объёмом воспроизводимых тестовых данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=2000)
+        parser.add_argument('--products', type=int, default=300)
+        parser.add_argument(
+            '--products-per-restaurant',
+            type=int,
+            default=30,
+            help='Сколько товаров в меню каждого ресторана'
+        )
+        parser.add_argument(
+            '--addresses',
+            type=int,
+            default=20000,
+            help='Сколько разных адресов доставки использовать в заказах'
+        )
+        parser.add_argument('--orders', type=int, default=1000000)
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=365,
+            help='За сколько последних дней создавать заказы'
+        )
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def handle(self, *args, **options):
+        if options['products'] < 1 or options['restaurants'] < 1:
+            raise CommandError('Нужен хотя бы один ресторан и один товар')
+        if options['addresses'] < 1 and options['orders']:
+            raise CommandError('Для заказов нужен хотя бы один адрес')
+        started_at = time.perf_counter()
+        generate_load_data(
+            random.Random(options['seed']),
+            restaurants_count=options['restaurants'],
+            products_count=options['products'],
+            products_per_restaurant=options['products_per_restaurant'],
+            addresses_count=options['addresses'],
+            orders_count=options['orders'],
+            days=options['days'],
+            batch_size=options['batch_size']
+        )
+        self.stdout.write(
+            f'Данные созданы за {time.perf_counter() - started_at:.1f} с'
+        )
@@ -0,0 +1,74 @@
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import Location, Order, Restaurant
+from star_burger.settings import GEOCODER_MAX_WORKERS, GEOCODER_RATE_LIMIT
+
+
+class Command(BaseCommand):
+    help = 'Определяет координаты адресов ресторанов, заказов и адресов из файла'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'files',
+            nargs='*',
+            help='Файлы с дополнительными адресами, по одному на строку'
+        )
+        parser.add_argument(
+            '--skip-orders',
+            action='store_true',
+            help='Не геокодировать адреса заказов'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Сколько адресов геокодировать и сохранять за раз'
+        )
+        parser.add_argument(
+            '--max-workers',
+            type=int,
+            default=GEOCODER_MAX_WORKERS,
+            help='Сколько запросов к геокодеру выполнять параллельно'
+        )
+        parser.add_argument(
+            '--rate-limit',
+            type=float,
+            default=GEOCODER_RATE_LIMIT,
+            help='Максимум запросов к геокодеру в секунду'
+        )
+
+    def handle(self, *args, **options):
+        addresses = set(
+            Restaurant.objects.values_list('address', flat=True)
+        )
+        if not options['skip_orders']:
+            addresses.update(
+                Order.objects.values_list('address', flat=True).distinct()
+            )
+        for file_path in options['files']:
+            with open(file_path, encoding='utf-8') as file:
+                addresses.update(line.strip() for line in file)
+
+        addresses = iter(addresses)
+        batches = iter(
+            lambda: list(islice(addresses, options['batch_size'])),
+            []
+        )
+        resolved_count = not_found_count = 0
+        for batch in batches:
+            coordinates = Location.objects.geocode_many(
+                batch,
+                max_workers=options['max_workers'],
+                rate_limit=options['rate_limit']
+            )
+            for found in coordinates.values():
+                if found:
+                    resolved_count += 1
+                else:
+                    not_found_count += 1
+        self.stdout.write(
+            f'Найдено координат: {resolved_count}, '
+            f'не найдено адресов: {not_found_count}'
+        )
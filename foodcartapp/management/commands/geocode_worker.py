@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from foodcartapp.models import GeocodingTask, Location
+
+
+class Command(BaseCommand):
+    help = 'Определяет координаты адресов из очереди геокодирования'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=20,
+            help='Сколько задач забирать из очереди за раз'
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1,
+            help='Пауза в секундах, когда очередь пуста'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Обработать очередь один раз и завершиться'
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            tasks = GeocodingTask.objects.claim(options['batch_size'])
+            coordinates = Location.objects.geocode_many(
+                task.address for task in tasks
+            )
+            GeocodingTask.objects.filter(
+                id__in=[task.id for task in tasks],
+                address__in=coordinates.keys()
+            ).delete()
+            if options['once'] and not tasks:
+                return
+            if not tasks:
+                time.sleep(options['sleep'])
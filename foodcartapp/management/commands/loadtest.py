@@ -0,0 +1,230 @@
+import json
+import logging
+import random
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from foodcartapp.load_data import generate_load_data
+from foodcartapp.models import Product
+
+
+ENDPOINTS = ['products', 'banners', 'order', 'manager_orders']
+
+
+class Command(BaseCommand):
+    help = 'Нагрузочное тестирование API и страниц менеджера на временной базе данных'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--restaurants', type=int, default=40)
+        parser.add_argument('--products', type=int, default=300)
+        parser.add_argument('--orders', type=int, default=1000)
+        parser.add_argument(
+            '--clients',
+            type=int,
+            default=8,
+            help='Сколько клиентов отправляют запросы одновременно'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Сколько запросов отправить к каждому адресу'
+        )
+        parser.add_argument(
+            '--endpoints',
+            nargs='+',
+            choices=ENDPOINTS,
+            default=ENDPOINTS
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--output',
+            help='Сохранить результаты в JSON-файл'
+        )
+        parser.add_argument(
+            '--baseline',
+            help='JSON-файл с результатами прошлого запуска для сравнения'
+        )
+        parser.add_argument(
+            '--max-regression',
+            type=float,
+            default=20,
+            help='Допустимый рост p95 относительно прошлого запуска, в процентах'
+        )
+
+    def handle(self, *args, **options):
+        old_database_name = self.create_test_database()
+        logging.getLogger('django.request').setLevel(logging.CRITICAL)
+        try:
+            with override_settings(DEBUG=False, ALLOWED_HOSTS=['testserver']):
+                generate_load_data(
+                    random.Random(options['seed']),
+                    restaurants_count=options['restaurants'],
+                    products_count=options['products'],
+                    products_per_restaurant=options['products'],
+                    addresses_count=100,
+                    orders_count=options['orders'],
+                    days=1
+                )
+                manager = User.objects.create(
+                    username='loadtest-manager',
+                    is_staff=True
+                )
+                results = {
+                    endpoint: self.run_endpoint(endpoint, manager, options)
+                    for endpoint in options['endpoints']
+                }
+        finally:
+            connection.creation.destroy_test_db(old_database_name, verbosity=0)
+
+        self.print_results(results)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(results, file, indent=4)
+        if options['baseline']:
+            self.compare_with_baseline(
+                results,
+                options['baseline'],
+                options['max_regression']
+            )
+
+    def create_test_database(self):
+        old_database_name = connection.settings_dict['NAME']
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = \
+                f'{old_database_name}.loadtest'
+        connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        return old_database_name
+
+    def run_endpoint(self, endpoint, manager, options):
+        products_ids = list(Product.objects.values_list('id', flat=True))
+        requests_count = options['requests']
+        clients_count = options['clients']
+
+        def run_client(client_number):
+            client = Client(raise_request_exception=False)
+            client.force_login(manager)
+            randomizer = random.Random(options['seed'] + client_number)
+            measurements = []
+            try:
+                for _ in range(client_number, requests_count, clients_count):
+                    with CaptureQueriesContext(connection) as queries:
+                        started_at = time.perf_counter()
+                        response = send_request(
+                            client,
+                            endpoint,
+                            randomizer,
+                            products_ids
+                        )
+                        duration = time.perf_counter() - started_at
+                    measurements.append(
+                        (duration, len(queries), response.status_code < 400)
+                    )
+            finally:
+                connection.close()
+            return measurements
+
+        warm_up_client = Client(raise_request_exception=False)
+        warm_up_client.force_login(manager)
+        send_request(
+            warm_up_client,
+            endpoint,
+            random.Random(options['seed']),
+            products_ids
+        )
+
+        started_at = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=clients_count) as executor:
+            measurements = [
+                measurement
+                for client_measurements
+                in executor.map(run_client, range(clients_count))
+                for measurement in client_measurements
+            ]
+        elapsed = time.perf_counter() - started_at
+
+        durations = sorted(duration for duration, _, _ in measurements)
+        return {
+            'requests': len(measurements),
+            'errors': sum(1 for _, _, ok in measurements if not ok),
+            'throughput': len(measurements) / elapsed,
+            'p50': percentile(durations, 50) * 1000,
+            'p95': percentile(durations, 95) * 1000,
+            'p99': percentile(durations, 99) * 1000,
+            'queries': statistics.mean(
+                queries for _, queries, _ in measurements
+            ),
+        }
+
+    def print_results(self, results):
+        self.stdout.write(
+            'адрес\tзапросов\tошибок\tзапр./с\tp50, мс\tp95, мс\tp99, мс\tSQL'
+        )
+        for endpoint, result in results.items():
+            self.stdout.write(
+                f'{endpoint}\t{result["requests"]}\t{result["errors"]}\t'
+                f'{result["throughput"]:.1f}\t{result["p50"]:.1f}\t'
+                f'{result["p95"]:.1f}\t{result["p99"]:.1f}\t'
+                f'{result["queries"]:.1f}'
+            )
+
+    def compare_with_baseline(self, results, baseline_path, max_regression):
+        with open(baseline_path) as file:
+            baseline = json.load(file)
+        regressions = []
+        for endpoint, result in results.items():
+            if endpoint not in baseline:
+                continue
+            allowed_p95 = baseline[endpoint]['p95'] * (1 + max_regression / 100)
+            if result['p95'] > allowed_p95:
+                regressions.append(
+                    f'{endpoint}: p95 {result["p95"]:.1f} мс, '
+                    f'было {baseline[endpoint]["p95"]:.1f} мс'
+                )
+            if result['queries'] > baseline[endpoint]['queries'] + 0.5:
+                regressions.append(
+                    f'{endpoint}: {result["queries"]:.1f} SQL-запросов, '
+                    f'было {baseline[endpoint]["queries"]:.1f}'
+                )
+        if regressions:
+            raise CommandError('\n'.join(regressions))
+
+
+def send_request(client, endpoint, randomizer, products_ids):
+    if endpoint == 'products':
+        return client.get('/api/products/')
+    if endpoint == 'banners':
+        return client.get('/api/banners/')
+    if endpoint == 'manager_orders':
+        return client.get('/manager/orders/')
+    cart = randomizer.sample(products_ids, min(len(products_ids), 3))
+    return client.post(
+        '/api/order/',
+        {
+            'firstname': 'Иван',
+            'lastname': 'Петров',
+            'phonenumber': f'+7900{randomizer.randrange(10 ** 7):07d}',
+            'address': f'Москва, улица {randomizer.randrange(100)}',
+            'products': [
+                {'product': product_id, 'quantity': randomizer.randint(1, 3)}
+                for product_id in cart
+            ],
+        },
+        content_type='application/json',
+        REMOTE_ADDR=f'10.0.{randomizer.randrange(256)}.{randomizer.randrange(256)}'
+    )
+
+
+def percentile(sorted_values, percent):
+    if not sorted_values:
+        return 0
+    index = min(len(sorted_values) - 1, len(sorted_values) * percent // 100)
+    return sorted_values[index]
+
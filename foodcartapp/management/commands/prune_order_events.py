@@ -0,0 +1,24 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from foodcartapp.models import OrderEvent
+
+
+class Command(BaseCommand):
+    help = 'Удаляет старые события заказов, которые уже доставлены менеджерам'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Сколько часов хранить события'
+        )
+
+    def handle(self, *args, **options):
+        deleted_count, _ = OrderEvent.objects.filter(
+            created_at__lt=timezone.now() - timedelta(hours=options['hours'])
+        ).delete()
+        self.stdout.write(f'Удалено событий: {deleted_count}')
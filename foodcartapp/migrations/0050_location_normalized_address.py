@@ -0,0 +1,41 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:31
+
+from django.db import migrations, models
+
+from foodcartapp.geo_utils import normalize_address
+
+
+def normalize_location_addresses(apps, schema_editor):
+    Location = apps.get_model('foodcartapp', 'Location')
+    kept_locations = {}
+    outdated_ids = []
+    for location in Location.objects.order_by('-created_at', '-id'):
+        address = normalize_address(location.address)
+        if address in kept_locations:
+            outdated_ids.append(location.id)
+        else:
+            kept_locations[address] = location
+    Location.objects.filter(id__in=outdated_ids).delete()
+    for address, location in kept_locations.items():
+        if address != location.address:
+            location.address = address
+            location.save(update_fields=['address'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0049_alter_order_status'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='location',
+            name='address',
+            field=models.CharField(blank=True, max_length=300, unique=True, verbose_name='Адрес'),
+        ),
+        migrations.RunPython(
+            normalize_location_addresses,
+            migrations.RunPython.noop
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:32
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0050_location_normalized_address'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodingTask',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('address', models.CharField(max_length=300, unique=True, verbose_name='Адрес')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Попыток')),
+                ('scheduled_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Запланирована на')),
+            ],
+            options={
+                'verbose_name': 'задача геокодирования',
+                'verbose_name_plural': 'задачи геокодирования',
+            },
+        ),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:39
+
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import migrations
+
+
+BANNERS = [
+    ('Burger', 'burger.jpg', 'Tasty Burger at your door step'),
+    ('Spices', 'food.jpg', 'All Cuisines'),
+    ('New York', 'tasty.jpg', 'Food is incomplete without a tasty dessert'),
+]
+
+
+def fill_banners(apps, schema_editor):
+    Banner = apps.get_model('foodcartapp', 'Banner')
+    for position, (title, image_name, text) in enumerate(BANNERS):
+        image_path = os.path.join(settings.BASE_DIR, 'assets', image_name)
+        if not os.path.exists(image_path):
+            continue
+        saved_image_name = f'banners/{image_name}'
+        if not default_storage.exists(saved_image_name):
+            with open(image_path, 'rb') as image:
+                saved_image_name = default_storage.save(
+                    saved_image_name,
+                    File(image)
+                )
+        Banner.objects.create(
+            title=title,
+            image=saved_image_name,
+            text=text,
+            position=position
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0053_banner'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_banners, migrations.RunPython.noop),
+    ]
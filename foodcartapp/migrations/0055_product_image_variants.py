@@ -0,0 +1,33 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0054_fill_banners'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='image_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64, verbose_name='хэш картинки'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='image_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='', verbose_name='картинка WebP'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to='', verbose_name='миниатюра'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='thumbnail_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to='', verbose_name='миниатюра WebP'),
+        ),
+    ]
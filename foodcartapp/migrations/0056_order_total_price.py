@@ -0,0 +1,55 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:49
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import F, Max, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+BATCH_SIZE = 10000
+
+
+def fill_total_price(apps, schema_editor):
+    Order = apps.get_model('foodcartapp', 'Order')
+    OrderElement = apps.get_model('foodcartapp', 'OrderElement')
+    total_price = (
+        OrderElement.objects
+        .filter(order=OuterRef('pk'))
+        .order_by()
+        .values('order')
+        .annotate(
+            total_price=Sum(
+                F('price') * F('quantity'),
+                output_field=models.DecimalField()
+            )
+        )
+        .values('total_price')
+    )
+    last_id = Order.objects.aggregate(last_id=Max('id'))['last_id'] or 0
+    for first_id in range(0, last_id + 1, BATCH_SIZE):
+        Order.objects.filter(
+            id__gte=first_id,
+            id__lt=first_id + BATCH_SIZE
+        ).update(
+            total_price=Coalesce(
+                Subquery(total_price),
+                0,
+                output_field=models.DecimalField()
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0055_product_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='total_price',
+            field=models.DecimalField(decimal_places=2, default=0, editable=False, max_digits=10, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Стоимость заказа'),
+        ),
+        migrations.RunPython(fill_total_price, migrations.RunPython.noop),
+    ]
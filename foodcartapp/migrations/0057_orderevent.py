@@ -0,0 +1,27 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:55
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0056_order_total_price'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderEvent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('order_id', models.PositiveIntegerField(verbose_name='ID заказа')),
+                ('kind', models.CharField(choices=[('created', 'Заказ создан'), ('changed', 'Заказ изменён'), ('deleted', 'Заказ удалён')], max_length=10, verbose_name='Событие')),
+                ('created_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='Время события')),
+            ],
+            options={
+                'verbose_name': 'событие заказа',
+                'verbose_name_plural': 'события заказов',
+            },
+        ),
+    ]
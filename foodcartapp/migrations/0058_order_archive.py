@@ -0,0 +1,70 @@
+# Generated by Django 3.2.15 on 2026-10-18 05:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+import phonenumber_field.modelfields
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0057_orderevent'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedOrder',
+            fields=[
+                ('id', models.IntegerField(primary_key=True, serialize=False, verbose_name='ID заказа')),
+                ('firstname', models.CharField(max_length=100, verbose_name='Имя')),
+                ('lastname', models.CharField(blank=True, max_length=200, verbose_name='Фамилия')),
+                ('phonenumber', phonenumber_field.modelfields.PhoneNumberField(db_index=True, max_length=128, region=None, verbose_name='Номер телефона')),
+                ('address', models.CharField(max_length=300, verbose_name='Адрес')),
+                ('status', models.CharField(choices=[('C', 'Создан'), ('A', 'Принят'), ('P', 'Готовится'), ('D', 'Передан в доставку'), ('DN', 'Заказ выполнен')], max_length=30, verbose_name='Статус заказа')),
+                ('payment', models.CharField(blank=True, choices=[('C', 'Оплата наличными при получении'), ('CD', 'Оплата картой при получении'), ('O', 'Оплата картой онлайн')], max_length=30, verbose_name='Способ оплаты')),
+                ('comment', models.TextField(blank=True, max_length=400, verbose_name='Комментарий')),
+                ('created_time', models.DateTimeField(db_index=True, verbose_name='Заказ создан')),
+                ('called_time', models.DateTimeField(blank=True, null=True, verbose_name='Время звонка')),
+                ('delivered_time', models.DateTimeField(blank=True, null=True, verbose_name='Время доставки')),
+                ('updated_at', models.DateTimeField(verbose_name='Заказ изменён')),
+                ('total_price', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Стоимость заказа')),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Заказ перенесён в архив')),
+            ],
+            options={
+                'verbose_name': 'архивный заказ',
+                'verbose_name_plural': 'архивные заказы',
+            },
+        ),
+        migrations.CreateModel(
+            name='ArchivedOrderElement',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(verbose_name='Количество')),
+                ('price', models.DecimalField(decimal_places=2, max_digits=7, verbose_name='Цена')),
+            ],
+            options={
+                'verbose_name': 'Содержание архивного заказа',
+                'verbose_name_plural': 'Содержание архивного заказа',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(condition=models.Q(('status', 'DN'), _negated=True), fields=['id'], name='order_unfinished_idx'),
+        ),
+        migrations.AddField(
+            model_name='archivedorderelement',
+            name='order',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='elements', to='foodcartapp.archivedorder', verbose_name='Заказ'),
+        ),
+        migrations.AddField(
+            model_name='archivedorderelement',
+            name='product',
+            field=models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_elements', to='foodcartapp.product', verbose_name='Позиция'),
+        ),
+        migrations.AddField(
+            model_name='archivedorder',
+            name='restaurant',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='archived_orders', to='foodcartapp.restaurant', verbose_name='Ресторан'),
+        ),
+    ]
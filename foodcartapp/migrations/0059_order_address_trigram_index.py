@@ -0,0 +1,37 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:00
+
+from django.db import migrations
+
+
+def create_address_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS order_address_trgm_idx '
+        'ON foodcartapp_order USING gin (UPPER(address::text) gin_trgm_ops)'
+    )
+
+
+def drop_address_trigram_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX CONCURRENTLY IF EXISTS order_address_trgm_idx'
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('foodcartapp', '0058_order_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            create_address_trigram_index,
+            drop_address_trigram_index
+        ),
+    ]
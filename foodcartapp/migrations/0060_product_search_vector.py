@@ -0,0 +1,61 @@
+# Generated by Django 3.2.15 on 2026-10-18 06:05
+
+import django.contrib.postgres.search
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+SEARCH_CONFIG = 'russian'
+
+
+def create_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    Product = apps.get_model('foodcartapp', 'Product')
+    ProductCategory = apps.get_model('foodcartapp', 'ProductCategory')
+    category_name = ProductCategory.objects.filter(
+        pk=OuterRef('category_id')
+    ).values('name')
+    Product.objects.update(search_vector=(
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(
+            Coalesce(Subquery(category_name), Value('')),
+            weight='B',
+            config=SEARCH_CONFIG
+        )
+        + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+    ))
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_search_vector_idx '
+        'ON foodcartapp_product USING gin (search_vector)'
+    )
+    schema_editor.execute(
+        'CREATE INDEX IF NOT EXISTS product_name_trgm_idx '
+        'ON foodcartapp_product USING gin (name gin_trgm_ops)'
+    )
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('DROP INDEX IF EXISTS product_name_trgm_idx')
+    schema_editor.execute('DROP INDEX IF EXISTS product_search_vector_idx')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('foodcartapp', '0059_order_address_trigram_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='поисковый вектор'),
+        ),
+        migrations.RunPython(create_search_indexes, drop_search_indexes),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 3.2.15 on 2026-10-18 08:10
+
+from django.db import migrations
+
+
+def create_firstname_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'CREATE INDEX CONCURRENTLY IF NOT EXISTS order_firstname_upper_idx '
+        'ON foodcartapp_order (UPPER(firstname::text) text_pattern_ops)'
+    )
+
+
+def drop_firstname_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        'DROP INDEX CONCURRENTLY IF EXISTS order_firstname_upper_idx'
+    )
+
+
+class Migration(migrations.Migration):
+
+    atomic = False
+
+    dependencies = [
+        ('foodcartapp', '0060_product_search_vector'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_firstname_index, drop_firstname_index),
+    ]
@@ -1,11 +1,41 @@
-from django.db import models
-from django.db.models import F, Sum
+from contextvars import ContextVar
+from datetime import timedelta
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+    SearchVectorField,
+    TrigramSimilarity
+)
+from django.db import connections, models, transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 from phonenumber_field.modelfields import PhoneNumberField
-from .geo_utils import fetch_coordinates
-from star_burger.settings import YA_API_KEY
+from .cache_versions import bump_cache_version
+from .geo_utils import (
+    fetch_coordinates_bulk,
+    geocoding_locks,
+    normalize_address
+)
+from star_burger.settings import (
+    YA_API_KEY,
+    GEOCODER_CACHE_TTL_DAYS,
+    GEOCODER_NEGATIVE_CACHE_TTL_DAYS,
+    GEOCODER_RETRY_DELAY,
+    GEOCODER_MAX_RETRY_DELAY,
+    GEOCODER_MAX_WORKERS,
+    GEOCODER_RATE_LIMIT
+)
+
+
+SEARCH_CONFIG = 'russian'
+GEOCODING_LOCK_TIMEOUT = 60
+
+order_events_suppressed = ContextVar('order_events_suppressed', default=False)
 
 
 class Restaurant(models.Model):
@@ -34,12 +64,46 @@ class Restaurant(models.Model):
 
 class ProductQuerySet(models.QuerySet):
     def available(self):
-        products = (
-            RestaurantMenuItem.objects
-            .filter(availability=True)
-            .values_list('product')
+        menu_items = RestaurantMenuItem.objects.filter(
+            product=OuterRef('pk'),
+            availability=True
         )
-        return self.filter(pk__in=products)
+        return self.filter(Exists(menu_items))
+
+    def search(self, query):
+        search_query = SearchQuery(
+            query,
+            config=SEARCH_CONFIG,
+            search_type='websearch'
+        )
+        return (
+            self
+            .filter(
+                Q(search_vector=search_query)
+                | Q(name__trigram_similar=query)
+            )
+            .annotate(
+                rank=SearchRank(F('search_vector'), search_query)
+                + TrigramSimilarity('name', query)
+            )
+            .order_by('-rank', 'id')
+        )
+
+    def update_search_vector(self):
+        if connections[self.db].vendor != 'postgresql':
+            return 0
+        category_name = ProductCategory.objects.filter(
+            pk=OuterRef('category_id')
+        ).values('name')
+        return self.update(search_vector=(
+            SearchVector('name', weight='A', config=SEARCH_CONFIG)
+            + SearchVector(
+                Coalesce(Subquery(category_name), Value('')),
+                weight='B',
+                config=SEARCH_CONFIG
+            )
+            + SearchVector('description', weight='C', config=SEARCH_CONFIG)
+        ))
 
 
 class ProductCategory(models.Model):
@@ -78,6 +142,27 @@ class Product(models.Model):
     image = models.ImageField(
         'картинка'
     )
+    image_hash = models.CharField(
+        'хэш картинки',
+        max_length=64,
+        blank=True,
+        editable=False,
+    )
+    thumbnail = models.ImageField(
+        'миниатюра',
+        blank=True,
+        editable=False,
+    )
+    thumbnail_webp = models.ImageField(
+        'миниатюра WebP',
+        blank=True,
+        editable=False,
+    )
+    image_webp = models.ImageField(
+        'картинка WebP',
+        blank=True,
+        editable=False,
+    )
     special_status = models.BooleanField(
         'спец.предложение',
         default=False,
@@ -88,6 +173,11 @@ class Product(models.Model):
         max_length=300,
         blank=True,
     )
+    search_vector = SearchVectorField(
+        'поисковый вектор',
+        null=True,
+        editable=False,
+    )
 
     objects = ProductQuerySet.as_manager()
 
@@ -98,6 +188,40 @@ class Product(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def preview_url(self):
+        if self.thumbnail:
+            return self.thumbnail.url
+        return self.image.url
+
+
+class Banner(models.Model):
+    title = models.CharField(
+        'заголовок',
+        max_length=50
+    )
+    image = models.ImageField(
+        'картинка'
+    )
+    text = models.CharField(
+        'текст',
+        max_length=200,
+        blank=True,
+    )
+    position = models.PositiveIntegerField(
+        'позиция',
+        default=0,
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = 'баннер'
+        verbose_name_plural = 'баннеры'
+        ordering = ['position', 'id']
+
+    def __str__(self):
+        return self.title
+
 
 class RestaurantMenuItem(models.Model):
     restaurant = models.ForeignKey(
@@ -130,29 +254,40 @@ class RestaurantMenuItem(models.Model):
 
 
 class OrderQuerySet(models.QuerySet):
-    def count_order_price(self):
-        return self.exclude(status='DN').order_by('status').annotate(
-            order_price = Sum(
-                F('elements__price')*F('elements__quantity')
+    def unfinished(self):
+        return self.exclude(status='DN').order_by('status')
+
+    def archive(self):
+        orders_statuses = dict(self.values_list('id', 'status'))
+        orders_ids = list(orders_statuses)
+        orders_fields = [
+            field.attname for field in ArchivedOrder._meta.concrete_fields
+            if field.name != 'archived_at'
+        ]
+        with transaction.atomic(using=self.db):
+            ArchivedOrder.objects.bulk_create(
+                ArchivedOrder(**order) for order in
+                Order.objects.filter(id__in=orders_ids).values(*orders_fields)
             )
-        )
-    
-    def fetch_restaurant(self):
-        restaurants = Restaurant.objects.all()
-        known_locations = {
-            'address': (lon, lat) for address, lon, lat in
-            Location.objects.values_list(
-                'address',
-                'longitude',
-                'latitude')
-        }
-        restaurants_coordinates = {
-            restaurant.id: known_locations[restaurant.address]
-            if restaurant.address in known_locations.keys()
-            else Location.objects.create_location(restaurant.address)
-            for restaurant in restaurants
-        }
-        
+            ArchivedOrderElement.objects.bulk_create(
+                ArchivedOrderElement(**element) for element in
+                OrderElement.objects.filter(order_id__in=orders_ids)
+                .values('order_id', 'product_id', 'quantity', 'price')
+            )
+            token = order_events_suppressed.set(True)
+            try:
+                Order.objects.filter(id__in=orders_ids).delete()
+            finally:
+                order_events_suppressed.reset(token)
+            OrderEvent.objects.record(
+                (
+                    order_id for order_id, status in orders_statuses.items()
+                    if status != Order.OrderStatusChoice.DONE
+                ),
+                OrderEvent.KindChoice.DELETED
+            )
+        return len(orders_ids)
+
 
 class Order(models.Model):
     
@@ -227,6 +362,11 @@ class Order(models.Model):
         blank=True,
         db_index=True
         )
+    updated_at = models.DateTimeField(
+        'Заказ изменён',
+        auto_now=True,
+        db_index=True
+        )
     restaurant = models.ForeignKey(
         Restaurant,
         verbose_name='Ресторан',
@@ -236,16 +376,40 @@ class Order(models.Model):
         null=True,
         help_text='Выберите ресторан для исполнения заказа'
     )
+    total_price = models.DecimalField(
+        'Стоимость заказа',
+        max_digits=10,
+        decimal_places=2,
+        default=0,
+        editable=False,
+        validators=[MinValueValidator(0)]
+    )
     
     objects = OrderQuerySet.as_manager()
     
     class Meta:
         verbose_name = 'заказ'
         verbose_name_plural = 'заказы'
+        indexes = [
+            models.Index(
+                fields=['id'],
+                name='order_unfinished_idx',
+                condition=~Q(status='DN')
+            ),
+        ]
 
     def __str__(self):
         return f"{self.firstname} {self.lastname}: {self.phonenumber}"
 
+    def update_total_price(self):
+        self.total_price = self.elements.aggregate(
+            total_price=Sum(
+                F('price') * F('quantity'),
+                output_field=models.DecimalField()
+            )
+        )['total_price'] or 0
+        self.save(update_fields=['total_price', 'updated_at'])
+
 
 class OrderElement(models.Model):
     order = models.ForeignKey(
@@ -282,34 +446,241 @@ class OrderElement(models.Model):
         return f"{self.order.firstname} {self.order.phonenumber} {self.order.address}"
 
 
+class ArchivedOrder(models.Model):
+    id = models.IntegerField(
+        primary_key=True,
+        verbose_name='ID заказа'
+    )
+    firstname = models.CharField(
+        verbose_name='Имя',
+        max_length=100
+    )
+    lastname = models.CharField(
+        verbose_name='Фамилия',
+        blank=True,
+        max_length=200
+    )
+    phonenumber = PhoneNumberField(
+        verbose_name='Номер телефона',
+        db_index=True
+    )
+    address = models.CharField(
+        verbose_name='Адрес',
+        max_length=300
+    )
+    status = models.CharField(
+        verbose_name='Статус заказа',
+        choices=Order.OrderStatusChoice.choices,
+        max_length=30
+    )
+    payment = models.CharField(
+        verbose_name='Способ оплаты',
+        choices=Order.OrderPaymentChoice.choices,
+        max_length=30,
+        blank=True
+    )
+    comment = models.TextField(
+        verbose_name='Комментарий',
+        blank=True,
+        max_length=400
+    )
+    created_time = models.DateTimeField(
+        'Заказ создан',
+        db_index=True
+    )
+    called_time = models.DateTimeField(
+        'Время звонка',
+        null=True,
+        blank=True
+    )
+    delivered_time = models.DateTimeField(
+        'Время доставки',
+        null=True,
+        blank=True
+    )
+    updated_at = models.DateTimeField('Заказ изменён')
+    restaurant = models.ForeignKey(
+        Restaurant,
+        verbose_name='Ресторан',
+        on_delete=models.SET_NULL,
+        related_name='archived_orders',
+        blank=True,
+        null=True
+    )
+    total_price = models.DecimalField(
+        'Стоимость заказа',
+        max_digits=10,
+        decimal_places=2,
+        default=0
+    )
+    archived_at = models.DateTimeField(
+        'Заказ перенесён в архив',
+        default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = 'архивный заказ'
+        verbose_name_plural = 'архивные заказы'
+
+    def __str__(self):
+        return f"{self.firstname} {self.lastname}: {self.phonenumber}"
+
+
+class ArchivedOrderElement(models.Model):
+    order = models.ForeignKey(
+        ArchivedOrder,
+        verbose_name='Заказ',
+        on_delete=models.CASCADE,
+        related_name='elements'
+    )
+    product = models.ForeignKey(
+        Product,
+        verbose_name='Позиция',
+        on_delete=models.SET_NULL,
+        related_name='archived_elements',
+        null=True
+    )
+    quantity = models.PositiveIntegerField(
+        verbose_name='Количество'
+    )
+    price = models.DecimalField(
+        max_digits=7,
+        decimal_places=2,
+        verbose_name='Цена',
+    )
+
+    class Meta:
+        verbose_name = 'Содержание архивного заказа'
+        verbose_name_plural = 'Содержание архивного заказа'
+
+
+class OrderEventQuerySet(models.QuerySet):
+    def record(self, orders_ids, kind):
+        if order_events_suppressed.get():
+            return
+        self.bulk_create([
+            OrderEvent(order_id=order_id, kind=kind)
+            for order_id in set(orders_ids)
+        ])
+
+
+class OrderEvent(models.Model):
+
+    class KindChoice(models.TextChoices):
+        CREATED = 'created', _('Заказ создан')
+        CHANGED = 'changed', _('Заказ изменён')
+        DELETED = 'deleted', _('Заказ удалён')
+
+    order_id = models.PositiveIntegerField(
+        verbose_name='ID заказа'
+    )
+    kind = models.CharField(
+        verbose_name='Событие',
+        choices=KindChoice.choices,
+        max_length=10
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Время события',
+        default=timezone.now,
+        db_index=True
+    )
+
+    objects = OrderEventQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'событие заказа'
+        verbose_name_plural = 'события заказов'
+
+    def __str__(self):
+        return f'{self.order_id}: {self.get_kind_display()}'
+
+
 class LocationQuerySet(models.QuerySet):
-    def create_location(self, address):
-        current_coordinates = fetch_coordinates(
-            YA_API_KEY,
-            address
-        )
-        if not current_coordinates:
-            return current_coordinates
-        else:
-            current_address, created = self \
-                .update_or_create(
-                    address=address,
-                    defaults={
-                        'created_at': timezone.now,
-                        **fetch_coordinates(
-                            YA_API_KEY,
-                            address
-                        )
-                    }
+    def fresh(self):
+        today = timezone.now().date()
+        return self.filter(
+            Q(
+                latitude__isnull=False,
+                created_at__gt=today - timedelta(days=GEOCODER_CACHE_TTL_DAYS)
+            ) | Q(
+                latitude__isnull=True,
+                created_at__gt=today - timedelta(
+                    days=GEOCODER_NEGATIVE_CACHE_TTL_DAYS
                 )
-            return current_address.longitude \
-                ,current_address.latitude
+            )
+        )
+
+    def known_coordinates(self, addresses):
+        addresses_keys = {
+            address: normalize_address(address) for address in addresses
+        }
+        locations = {
+            location.address: location for location in
+            self.filter(address__in=set(addresses_keys.values()))
+        }
+        fresh_addresses = set(
+            self.fresh()
+            .filter(address__in=locations.keys())
+            .values_list('address', flat=True)
+        )
+        GeocodingTask.objects.enqueue(
+            key for key in set(addresses_keys.values())
+            if key not in fresh_addresses
+        )
+        return {
+            address: locations[key].coordinates
+            for address, key in addresses_keys.items()
+            if key in locations
+        }
+
+    def geocode_many(
+        self,
+        addresses,
+        max_workers=GEOCODER_MAX_WORKERS,
+        rate_limit=GEOCODER_RATE_LIMIT
+    ):
+        keys = {normalize_address(address) for address in addresses} - {''}
+        coordinates = {
+            location.address: location.coordinates for location in
+            self.fresh().filter(address__in=keys)
+        }
+        missing_keys = keys - coordinates.keys()
+        lock_timeout = GEOCODING_LOCK_TIMEOUT \
+            + round(len(missing_keys) / rate_limit)
+        with geocoding_locks(missing_keys, lock_timeout) as locked_keys:
+            coordinates.update(
+                (location.address, location.coordinates) for location in
+                self.fresh().filter(address__in=locked_keys)
+            )
+            found_coordinates = fetch_coordinates_bulk(
+                YA_API_KEY,
+                locked_keys - coordinates.keys(),
+                max_workers=max_workers,
+                rate_limit=rate_limit
+            )
+            today = timezone.now().date()
+            with transaction.atomic():
+                self.filter(address__in=found_coordinates.keys()).delete()
+                locations = self.bulk_create([
+                    Location(
+                        address=key,
+                        created_at=today,
+                        **(found or {'latitude': None, 'longitude': None})
+                    ) for key, found in found_coordinates.items()
+                ], ignore_conflicts=True)
+        if locations:
+            bump_cache_version('locations')
+        coordinates.update(
+            (location.address, location.coordinates)
+            for location in locations
+        )
+        return coordinates
 
 
 class Location(models.Model):
     address = models.CharField(
         verbose_name='Адрес',
-        max_length=100,
+        max_length=300,
         blank=True,
         unique=True
     )
@@ -334,3 +705,67 @@ class Location(models.Model):
     
     def __str__(self):
         return self.address
+
+    @property
+    def coordinates(self):
+        if self.latitude is None or self.longitude is None:
+            return None
+        return self.latitude, self.longitude
+
+
+class GeocodingTaskQuerySet(models.QuerySet):
+    def enqueue(self, addresses):
+        keys = {normalize_address(address) for address in addresses} - {''}
+        if not keys:
+            return
+        self.bulk_create(
+            [GeocodingTask(address=key) for key in keys],
+            ignore_conflicts=True
+        )
+
+    def claim(self, batch_size):
+        now = timezone.now()
+        with transaction.atomic():
+            tasks = list(
+                self.filter(scheduled_at__lte=now)
+                .select_for_update(skip_locked=True)
+                .order_by('scheduled_at')[:batch_size]
+            )
+            for task in tasks:
+                task.attempts += 1
+                task.scheduled_at = now + task.get_retry_delay()
+            self.bulk_update(tasks, ['attempts', 'scheduled_at'])
+        return tasks
+
+
+class GeocodingTask(models.Model):
+    address = models.CharField(
+        verbose_name='Адрес',
+        max_length=300,
+        unique=True
+    )
+    attempts = models.PositiveIntegerField(
+        verbose_name='Попыток',
+        default=0
+    )
+    scheduled_at = models.DateTimeField(
+        verbose_name='Запланирована на',
+        default=timezone.now,
+        db_index=True
+    )
+    objects = GeocodingTaskQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'задача геокодирования'
+        verbose_name_plural = 'задачи геокодирования'
+
+    def __str__(self):
+        return self.address
+
+    def get_retry_delay(self):
+        return timedelta(
+            seconds=min(
+                GEOCODER_RETRY_DELAY * 2 ** self.attempts,
+                GEOCODER_MAX_RETRY_DELAY
+            )
+        )
@@ -0,0 +1,299 @@
+import re
+from bisect import bisect_left
+from collections import Counter, defaultdict
+from functools import lru_cache
+
+import numpy as np
+from django.db import connections
+
+from star_burger.db_router import primary_reads
+
+from .cache_versions import get_cache_version
+from .models import Product
+
+
+WORD_PATTERN = re.compile(r'\w+')
+VOWELS = 'аеиоуыэюя'
+
+PERFECTIVE_GERUND_ENDINGS = (
+    ('вшись', 'вши', 'в'),
+    ('ившись', 'ывшись', 'ивши', 'ывши', 'ив', 'ыв'),
+)
+ADJECTIVE_ENDINGS = (
+    'ими', 'ыми', 'его', 'ого', 'ему', 'ому', 'ее', 'ие', 'ые', 'ое', 'ей',
+    'ий', 'ый', 'ой', 'ем', 'им', 'ым', 'ом', 'их', 'ых', 'ую', 'юю', 'ая',
+    'яя', 'ою', 'ею',
+)
+PARTICIPLE_ENDINGS = (
+    ('ем', 'нн', 'вш', 'ющ', 'щ'),
+    ('ивш', 'ывш', 'ующ'),
+)
+REFLEXIVE_ENDINGS = ('ся', 'сь')
+VERB_ENDINGS = (
+    (
+        'ете', 'йте', 'ешь', 'нно', 'ла', 'на', 'ли', 'ем', 'ло', 'но',
+        'ет', 'ют', 'ны', 'ть', 'й', 'л', 'н',
+    ),
+    (
+        'ейте', 'уйте', 'ила', 'ыла', 'ена', 'ите', 'или', 'ыли',
+        'ило', 'ыло', 'ено', 'ует', 'уют', 'ены', 'ить', 'ыть', 'ишь',
+        'ей', 'уй', 'ил', 'ыл', 'им', 'ым', 'ен', 'ят', 'ит', 'ыт',
+        'ую', 'ю',
+    ),
+)
+NOUN_ENDINGS = (
+    'иями', 'ями', 'ами', 'ией', 'иям', 'ием', 'иях', 'ев', 'ов', 'ие',
+    'ье', 'еи', 'ии', 'ей', 'ой', 'ий', 'ям', 'ем', 'ам', 'ом', 'ах', 'ях',
+    'ию', 'ью', 'ия', 'ья', 'а', 'е', 'и', 'й', 'о', 'у', 'ы', 'ь', 'ю',
+    'я',
+)
+SUPERLATIVE_ENDINGS = ('ейше', 'ейш')
+DERIVATIONAL_ENDINGS = ('ость', 'ост')
+
+NAME_WEIGHT = 1
+CATEGORY_WEIGHT = 0.5
+DESCRIPTION_WEIGHT = 0.25
+PREFIX_SIMILARITY = 0.8
+MIN_PREFIX_LENGTH = 3
+SIMILARITY_THRESHOLD = 0.3
+MAX_SIMILAR_STEMS = 10
+MAX_FILTERED_PRODUCTS = 1000
+
+
+def find_region_start(word, start=0):
+    for position in range(start + 1, len(word)):
+        if word[position - 1] in VOWELS and word[position] not in VOWELS:
+            return position + 1
+    return len(word)
+
+
+def remove_ending(word, region_start, endings, preceded_by=''):
+    for ending in endings:
+        stem_length = len(word) - len(ending)
+        if not word.endswith(ending) or stem_length < region_start:
+            continue
+        if preceded_by and (
+            stem_length <= region_start
+            or word[stem_length - 1] not in preceded_by
+        ):
+            continue
+        return word[:stem_length]
+    return None
+
+
+def remove_grouped_ending(word, region_start, grouped_endings):
+    preceded_endings, endings = grouped_endings
+    return remove_ending(word, region_start, endings) \
+        or remove_ending(word, region_start, preceded_endings, 'ая')
+
+
+@lru_cache(maxsize=100000)
+def stem(word):
+    word = word.lower().replace('ё', 'е')
+    rv_start = next(
+        (
+            position + 1 for position, letter in enumerate(word)
+            if letter in VOWELS
+        ),
+        len(word)
+    )
+    if rv_start >= len(word):
+        return word
+    r2_start = find_region_start(word, find_region_start(word))
+
+    stemmed_word = remove_grouped_ending(
+        word,
+        rv_start,
+        PERFECTIVE_GERUND_ENDINGS
+    )
+    if stemmed_word is None:
+        word = remove_ending(word, rv_start, REFLEXIVE_ENDINGS) or word
+        stemmed_word = remove_ending(word, rv_start, ADJECTIVE_ENDINGS)
+        if stemmed_word is not None:
+            word = remove_grouped_ending(
+                stemmed_word,
+                rv_start,
+                PARTICIPLE_ENDINGS
+            ) or stemmed_word
+        else:
+            word = remove_grouped_ending(word, rv_start, VERB_ENDINGS) \
+                or remove_ending(word, rv_start, NOUN_ENDINGS) \
+                or word
+    else:
+        word = stemmed_word
+
+    word = remove_ending(word, rv_start, ('и',)) or word
+    word = remove_ending(word, r2_start, DERIVATIONAL_ENDINGS) or word
+    word = remove_ending(word, rv_start, SUPERLATIVE_ENDINGS) or word
+    if word.endswith('нн') and len(word) - 1 > rv_start:
+        return word[:-1]
+    return remove_ending(word, rv_start, ('ь',)) or word
+
+
+def get_stems(text):
+    return [
+        stem(word) for word in WORD_PATTERN.findall(text or '')
+        if len(word) > 1
+    ]
+
+
+def get_trigrams(word):
+    padded_word = f'  {word} '
+    return {
+        padded_word[position:position + 3]
+        for position in range(len(padded_word) - 2)
+    }
+
+
+class ProductsSearchIndex:
+    def __init__(self, version, products):
+        self.version = version
+        self.products_ids = np.array(
+            [product_id for product_id, *_ in products],
+            dtype=np.int64
+        )
+        self.availability_version = None
+        self.available = np.zeros(len(self.products_ids), dtype=bool)
+
+        stems_weights = defaultdict(dict)
+        for position, (_, name, category_name, description) in enumerate(
+            products
+        ):
+            for text, weight in (
+                (description, DESCRIPTION_WEIGHT),
+                (category_name, CATEGORY_WEIGHT),
+                (name, NAME_WEIGHT),
+            ):
+                for word_stem in get_stems(text):
+                    stems_weights[word_stem][position] = weight
+
+        self.vocabulary = sorted(stems_weights)
+        self.postings = {}
+        self.trigrams = defaultdict(list)
+        for stem_position, word_stem in enumerate(self.vocabulary):
+            positions_weights = stems_weights[word_stem]
+            self.postings[word_stem] = (
+                np.fromiter(positions_weights.keys(), dtype=np.int32),
+                np.fromiter(positions_weights.values(), dtype=np.float32)
+            )
+            if word_stem.isdigit():
+                continue
+            for trigram in get_trigrams(word_stem):
+                self.trigrams[trigram].append(stem_position)
+
+    @classmethod
+    def build(cls, version):
+        products = list(
+            Product.objects
+            .order_by('id')
+            .values_list('id', 'name', 'category__name', 'description')
+        )
+        return cls(version, products)
+
+    def update_availability(self, version):
+        available_products_ids = Product.objects.available() \
+            .values_list('id', flat=True)
+        self.available = np.isin(
+            self.products_ids,
+            np.fromiter(available_products_ids, dtype=np.int64)
+        )
+        self.availability_version = version
+
+    def find_similar_stems(self, word_stem):
+        similar_stems = {}
+        if word_stem in self.postings:
+            similar_stems[word_stem] = 1
+
+        if len(word_stem) >= MIN_PREFIX_LENGTH:
+            position = bisect_left(self.vocabulary, word_stem)
+            while position < len(self.vocabulary) \
+                    and len(similar_stems) < MAX_SIMILAR_STEMS \
+                    and self.vocabulary[position].startswith(word_stem):
+                similar_stems.setdefault(
+                    self.vocabulary[position],
+                    PREFIX_SIMILARITY
+                )
+                position += 1
+
+        if similar_stems or word_stem.isdigit():
+            return list(similar_stems.items())
+
+        trigrams = get_trigrams(word_stem)
+        shared_trigrams = Counter(
+            stem_position
+            for trigram in trigrams
+            for stem_position in self.trigrams.get(trigram, [])
+        )
+        for stem_position, shared_count in shared_trigrams.items():
+            candidate = self.vocabulary[stem_position]
+            similarity = shared_count / (
+                len(trigrams) + len(get_trigrams(candidate)) - shared_count
+            )
+            if similarity >= SIMILARITY_THRESHOLD:
+                similar_stems[candidate] = similarity
+        return sorted(
+            similar_stems.items(),
+            key=lambda item: item[1],
+            reverse=True
+        )[:MAX_SIMILAR_STEMS]
+
+    def search(self, query, available_only=True):
+        query_stems = set(get_stems(query))
+        if not query_stems:
+            return []
+        scores = np.zeros(len(self.products_ids), dtype=np.float32)
+        found = self.available.copy() if available_only \
+            else np.ones(len(self.products_ids), dtype=bool)
+        for word_stem in query_stems:
+            word_scores = np.zeros(len(self.products_ids), dtype=np.float32)
+            for similar_stem, similarity in self.find_similar_stems(word_stem):
+                positions, weights = self.postings[similar_stem]
+                np.maximum.at(word_scores, positions, weights * similarity)
+            scores += word_scores
+            found &= word_scores > 0
+        found_positions = np.flatnonzero(found)
+        ranking = np.lexsort((found_positions, -scores[found_positions]))
+        return self.products_ids[found_positions[ranking]].tolist()
+
+
+products_search_index = None
+
+
+def get_products_search_index():
+    global products_search_index
+    version = get_cache_version('products')
+    availability_version = get_cache_version('menu')
+    index = products_search_index
+    if index is None or index.version != version:
+        with primary_reads():
+            index = ProductsSearchIndex.build(version)
+        products_search_index = index
+    if index.availability_version != availability_version:
+        with primary_reads():
+            index.update_availability(availability_version)
+    return index
+
+
+def filter_products(products, query):
+    if connections[products.db].vendor == 'postgresql':
+        return products.search(query)
+    products_ids = get_products_search_index().search(
+        query,
+        available_only=False
+    )
+    return products.filter(pk__in=products_ids[:MAX_FILTERED_PRODUCTS])
+
+
+def search_products(query, offset, limit):
+    products = Product.objects.select_related('category') \
+        .defer('search_vector')
+    if connections[products.db].vendor == 'postgresql':
+        found = products.available().search(query)
+        return found.count(), list(found[offset:offset + limit])
+    products_ids = get_products_search_index().search(query)
+    page_products_ids = products_ids[offset:offset + limit]
+    page_products = products.in_bulk(page_products_ids)
+    return len(products_ids), [
+        page_products[product_id] for product_id in page_products_ids
+        if product_id in page_products
+    ]
@@ -0,0 +1,168 @@
+import math
+from collections import defaultdict
+
+import numpy as np
+from django.core.cache import cache
+
+from star_burger.db_router import primary_reads
+
+from .cache_versions import get_cache_version
+from .geo_utils import EARTH_RADIUS_KM, calculate_distance_matrix
+from .models import Location, Restaurant
+
+
+RESTAURANTS_INDEX_CACHE_KEY = 'restaurants-spatial-index'
+CELL_SIZE_DEGREES = 0.05
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def get_longitude_scale(latitude):
+    return max(math.cos(math.radians(min(abs(latitude), 89.9))), 1e-3)
+
+
+class RestaurantsIndex:
+    def __init__(self, version, restaurants):
+        self.version = version
+        self.restaurants_ids = [
+            restaurant_id for restaurant_id, _ in restaurants
+        ]
+        self.coordinates = np.array(
+            [coordinates for _, coordinates in restaurants],
+            dtype=float
+        ).reshape(-1, 2)
+        self.cells = defaultdict(list)
+        for position, (latitude, longitude) in enumerate(self.coordinates):
+            self.cells[self.get_cell(latitude, longitude)].append(position)
+
+    @classmethod
+    def build(cls, version):
+        addresses = dict(Restaurant.objects.values_list('id', 'address'))
+        coordinates = Location.objects.known_coordinates(addresses.values())
+        return cls(version, [
+            (restaurant_id, coordinates[address])
+            for restaurant_id, address in addresses.items()
+            if coordinates.get(address)
+        ])
+
+    @staticmethod
+    def get_cell(latitude, longitude):
+        return (
+            math.floor(latitude / CELL_SIZE_DEGREES),
+            math.floor(longitude / CELL_SIZE_DEGREES)
+        )
+
+    def rank(self, origin, positions):
+        if not positions:
+            return []
+        distances = calculate_distance_matrix(
+            origin,
+            self.coordinates[positions]
+        )[0].tolist()
+        return sorted(
+            (
+                (self.restaurants_ids[position], distance)
+                for position, distance in zip(positions, distances)
+            ),
+            key=lambda ranked: ranked[1]
+        )
+
+    def filter_positions(self, positions, allowed):
+        if allowed is None:
+            return positions
+        return [
+            position for position in positions
+            if self.restaurants_ids[position] in allowed
+        ]
+
+    def find_within(self, origin, radius_km, allowed=None):
+        latitude, longitude = origin
+        latitude_span = radius_km / KM_PER_DEGREE
+        longitude_span = latitude_span / get_longitude_scale(
+            abs(latitude) + latitude_span
+        )
+        min_row, min_column = self.get_cell(
+            latitude - latitude_span,
+            longitude - longitude_span
+        )
+        max_row, max_column = self.get_cell(
+            latitude + latitude_span,
+            longitude + longitude_span
+        )
+        if (max_row - min_row + 1) * (max_column - min_column + 1) \
+                > len(self.cells):
+            candidates = [
+                position for (row, column), positions in self.cells.items()
+                if min_row <= row <= max_row
+                and min_column <= column <= max_column
+                for position in positions
+            ]
+        else:
+            candidates = [
+                position
+                for row in range(min_row, max_row + 1)
+                for column in range(min_column, max_column + 1)
+                for position in self.cells.get((row, column), [])
+            ]
+        return [
+            (restaurant_id, distance)
+            for restaurant_id, distance in self.rank(
+                origin,
+                self.filter_positions(candidates, allowed)
+            )
+            if distance <= radius_km
+        ]
+
+    def get_ring_cells(self, center_row, center_column, ring):
+        if not ring:
+            return [(center_row, center_column)]
+        rows = range(center_row - ring, center_row + ring + 1)
+        columns = range(center_column - ring + 1, center_column + ring)
+        return [
+            (row, column)
+            for row in rows
+            for column in (center_column - ring, center_column + ring)
+        ] + [
+            (row, column)
+            for row in (center_row - ring, center_row + ring)
+            for column in columns
+        ]
+
+    def find_nearest(self, origin, count, allowed=None):
+        if count < 1:
+            return []
+        latitude, longitude = origin
+        center_row, center_column = self.get_cell(latitude, longitude)
+        candidates = []
+        ring = 0
+        while (2 * ring + 1) ** 2 <= len(self.cells):
+            for cell in self.get_ring_cells(center_row, center_column, ring):
+                candidates.extend(
+                    self.filter_positions(self.cells.get(cell, []), allowed)
+                )
+            if len(candidates) >= count:
+                ranking = self.rank(origin, candidates)
+                covered_km = ring * CELL_SIZE_DEGREES * KM_PER_DEGREE \
+                    * get_longitude_scale(
+                        abs(latitude) + ring * CELL_SIZE_DEGREES
+                    )
+                if ranking[count - 1][1] <= covered_km:
+                    return ranking[:count]
+            ring += 1
+        all_positions = list(range(len(self.restaurants_ids)))
+        return self.rank(
+            origin,
+            self.filter_positions(all_positions, allowed)
+        )[:count]
+
+
+def get_restaurants_index():
+    version = (
+        get_cache_version('restaurants'),
+        get_cache_version('locations')
+    )
+    index = cache.get(RESTAURANTS_INDEX_CACHE_KEY)
+    if index is None or index.version != version:
+        with primary_reads():
+            index = RestaurantsIndex.build(version)
+        cache.set(RESTAURANTS_INDEX_CACHE_KEY, index, None)
+    return index
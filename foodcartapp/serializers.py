@@ -1,10 +1,27 @@
+from django.utils.http import urlsafe_base64_decode
 from phonenumber_field.modelfields import PhoneNumberField
 from rest_framework import serializers
 from rest_framework.serializers import ModelSerializer
-from .models import Order, OrderElement
+from .models import GeocodingTask, Order, OrderElement, Product
+
+
+CATALOG_FIELDS_COLUMNS = {
+    'id': ['id'],
+    'name': ['name'],
+    'price': ['price'],
+    'special_status': ['special_status'],
+    'description': ['description'],
+    'category': ['category_id', 'category__name'],
+    'image': ['image'],
+    'image_webp': ['image_webp'],
+    'thumbnail': ['thumbnail'],
+    'thumbnail_webp': ['thumbnail_webp'],
+}
 
 
 class OrderElementSerializer(ModelSerializer):
+    product = serializers.IntegerField()
+
     class Meta:
         model = OrderElement
         fields = [
@@ -21,21 +38,47 @@ class OrderSerializer(ModelSerializer):
         )
     phonenumber = PhoneNumberField(region='RU')
 
+    def validate_products(self, products):
+        found_products = Product.objects.in_bulk(
+            {order_element['product'] for order_element in products}
+        )
+        errors = [
+            {
+                'product': [
+                    serializers.PrimaryKeyRelatedField
+                    .default_error_messages['does_not_exist']
+                    .format(pk_value=order_element['product'])
+                ]
+            } if order_element['product'] not in found_products else {}
+            for order_element in products
+        ]
+        if any(errors):
+            raise serializers.ValidationError(errors)
+        for order_element in products:
+            order_element['product'] = found_products[order_element['product']]
+        return products
+
     def create(self, validated_data):
         products = validated_data.get('products')
         del validated_data['products']
         order = Order.objects.create(
+            total_price=sum(
+                order_element['product'].price * order_element['quantity']
+                for order_element in products
+            ),
             **validated_data
         )
-        for order_element in products:
-            OrderElement.objects.create(
+        OrderElement.objects.bulk_create([
+            OrderElement(
                 order=order,
                 product=order_element['product'],
                 quantity=order_element['quantity'],
                 price=order_element['product'].price
-                )
+                ) for order_element in products
+        ])
+        GeocodingTask.objects.enqueue([order.address])
         return order
-        
+
     class Meta:
         model = Order
         fields = [
@@ -46,3 +89,51 @@ class OrderSerializer(ModelSerializer):
             'address',
             'products'
         ]
+
+
+class NearbyRestaurantsSerializer(serializers.Serializer):
+    address = serializers.CharField(max_length=300)
+    radius = serializers.FloatField(min_value=0, required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=10)
+    products = serializers.ListField(
+        child=serializers.IntegerField(),
+        required=False
+    )
+
+
+class ProductSearchSerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=100)
+    page = serializers.IntegerField(min_value=1, default=1)
+    page_size = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class ProductCatalogSerializer(serializers.Serializer):
+    category = serializers.IntegerField(required=False)
+    restaurant = serializers.IntegerField(required=False)
+    special_status = serializers.BooleanField(
+        required=False,
+        allow_null=True,
+        default=None
+    )
+    cursor = serializers.CharField(required=False)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+    fields = serializers.CharField(required=False)
+
+    def validate_cursor(self, cursor):
+        try:
+            return int(urlsafe_base64_decode(cursor))
+        except ValueError:
+            raise serializers.ValidationError('Некорректный курсор.')
+
+    def validate_fields(self, fields):
+        fields = [field.strip() for field in fields.split(',') if field.strip()]
+        if not fields:
+            raise serializers.ValidationError('Укажите хотя бы одно поле.')
+        unknown_fields = [
+            field for field in fields if field not in CATALOG_FIELDS_COLUMNS
+        ]
+        if unknown_fields:
+            raise serializers.ValidationError(
+                f'Неизвестные поля: {", ".join(unknown_fields)}.'
+            )
+        return list(dict.fromkeys(fields))
@@ -0,0 +1,103 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache_versions import bump_cache_version
+from .images import generate_image_variants_in_background
+from .models import (
+    Banner,
+    Location,
+    Order,
+    OrderElement,
+    OrderEvent,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem
+)
+
+
+@receiver(post_save, sender=RestaurantMenuItem)
+@receiver(post_delete, sender=RestaurantMenuItem)
+def invalidate_menu_caches(sender, **kwargs):
+    bump_cache_version('menu', 'catalog')
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+@receiver(post_save, sender=ProductCategory)
+@receiver(post_delete, sender=ProductCategory)
+def invalidate_catalog_caches(sender, **kwargs):
+    bump_cache_version('catalog', 'products')
+
+
+@receiver(post_save, sender=Product)
+def update_product_search_vector(sender, instance, **kwargs):
+    Product.objects.filter(pk=instance.pk).update_search_vector()
+
+
+@receiver(post_save, sender=ProductCategory)
+def update_category_products_search_vectors(sender, instance, **kwargs):
+    Product.objects.filter(category=instance).update_search_vector()
+
+
+@receiver(pre_save, sender=Product)
+def reset_image_variants(sender, instance, **kwargs):
+    if not instance.pk:
+        return
+    stored_image = Product.objects.filter(pk=instance.pk) \
+        .values_list('image', flat=True).first()
+    if stored_image == instance.image.name:
+        return
+    instance.image_hash = ''
+    instance.thumbnail = ''
+    instance.thumbnail_webp = ''
+    instance.image_webp = ''
+
+
+@receiver(post_save, sender=Product)
+def schedule_image_variants(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: generate_image_variants_in_background(instance.pk)
+    )
+
+
+@receiver(post_save, sender=Restaurant)
+@receiver(post_delete, sender=Restaurant)
+def invalidate_restaurants_caches(sender, **kwargs):
+    bump_cache_version('restaurants')
+
+
+@receiver(post_save, sender=Banner)
+@receiver(post_delete, sender=Banner)
+def invalidate_banners_caches(sender, **kwargs):
+    bump_cache_version('banners')
+
+
+@receiver(post_save, sender=Location)
+@receiver(post_delete, sender=Location)
+def invalidate_locations_caches(sender, **kwargs):
+    bump_cache_version('locations')
+
+
+@receiver(post_save, sender=Order)
+def record_order_saved(sender, instance, created, **kwargs):
+    OrderEvent.objects.record(
+        [instance.id],
+        OrderEvent.KindChoice.CREATED if created
+        else OrderEvent.KindChoice.CHANGED
+    )
+
+
+@receiver(post_delete, sender=Order)
+def record_order_deleted(sender, instance, **kwargs):
+    OrderEvent.objects.record([instance.id], OrderEvent.KindChoice.DELETED)
+
+
+@receiver(post_save, sender=OrderElement)
+@receiver(post_delete, sender=OrderElement)
+def record_order_elements_changed(sender, instance, **kwargs):
+    OrderEvent.objects.record(
+        [instance.order_id],
+        OrderEvent.KindChoice.CHANGED
+    )
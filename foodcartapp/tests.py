@@ -0,0 +1,873 @@
+import time
+from datetime import timedelta
+from importlib import import_module
+from io import BytesIO, StringIO
+from tempfile import TemporaryDirectory
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.contrib.contenttypes.models import ContentType
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.apps import apps
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connection
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import Throttled
+
+from .geo_utils import geocoding_locks
+from .images import generate_image_variants
+from .models import (
+    ArchivedOrder,
+    Banner,
+    GeocodingTask,
+    Location,
+    Order,
+    OrderElement,
+    OrderEvent,
+    Product,
+    ProductCategory,
+    Restaurant,
+    RestaurantMenuItem
+)
+from .throttling import (
+    CONCURRENCY_SLOT_TIMEOUT,
+    acquire_slot,
+    limit_concurrency
+)
+from star_burger.db_router import (
+    PRIMARY_COOKIE_NAME,
+    REPLICA_DB_ALIAS,
+    PrimaryReplicaRouter,
+    ReplicaRoutingMiddleware,
+    SharedReplicaConnectionMixin,
+    pin_to_primary,
+    primary_reads,
+    replica_reads
+)
+from star_burger.settings import (
+    BANNERS_CACHE_MAX_AGE,
+    ORDER_API_IP_BURST,
+    ORDER_API_MAX_CONCURRENCY,
+    ORDER_API_PHONE_BURST
+)
+
+
+class OrderAdminQueriesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            username='admin',
+            is_staff=True,
+            is_superuser=True
+        )
+        cls.products = [
+            Product.objects.create(
+                name=f'Бургер {number}',
+                price=100,
+                image='burger.jpg',
+                thumbnail=f'thumbnails/burger-{number}.jpg'
+            ) for number in range(50)
+        ]
+
+    def create_order(self, elements_count):
+        order = Order.objects.create(
+            firstname='Иван',
+            phonenumber='+79001234567',
+            address='Заказ'
+        )
+        OrderElement.objects.bulk_create([
+            OrderElement(
+                order=order,
+                product=product,
+                quantity=1,
+                price=product.price
+            ) for product in self.products[:elements_count]
+        ])
+        return order
+
+    def count_change_page_queries(self, order):
+        url = reverse('admin:foodcartapp_order_change', args=[order.id])
+        ContentType.objects.clear_cache()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(context), response
+
+    def test_queries_count_does_not_depend_on_elements_count(self):
+        self.client.force_login(self.admin)
+        small_order_queries, _ = self.count_change_page_queries(
+            self.create_order(1)
+        )
+        large_order_queries, response = self.count_change_page_queries(
+            self.create_order(50)
+        )
+        self.assertEqual(large_order_queries, small_order_queries)
+        self.assertContains(response, 'thumbnails/burger-49.jpg')
+
+
+@override_settings(REST_FRAMEWORK={'NUM_PROXIES': 0})
+class OrderRegistrationTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.products = [
+            Product.objects.create(
+                name=f'Бургер {number}',
+                price=100 + number,
+                image='burger.jpg'
+            ) for number in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+
+    def register_order(self, products):
+        return self.client.post(
+            reverse('foodcartapp:register_order'),
+            {
+                'firstname': 'Иван',
+                'lastname': 'Петров',
+                'phonenumber': '+79001234567',
+                'address': 'Москва, Тверская 1',
+                'products': products,
+            },
+            content_type='application/json'
+        )
+
+    def test_unknown_products_are_reported_per_element(self):
+        response = self.register_order([
+            {'product': 0, 'quantity': 1},
+            {'product': self.products[0].id, 'quantity': 1},
+            {'product': -1, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {
+            'products': [
+                {'product': [
+                    'Недопустимый первичный ключ "0" - объект не существует.'
+                ]},
+                {},
+                {'product': [
+                    'Недопустимый первичный ключ "-1" - объект не существует.'
+                ]},
+            ]
+        })
+        self.assertFalse(Order.objects.exists())
+
+    def test_total_price_is_set_on_registration(self):
+        response = self.register_order([
+            {'product': self.products[0].id, 'quantity': 2},
+            {'product': self.products[1].id, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Order.objects.get().total_price, 100 * 2 + 101)
+
+    def test_admin_inline_edit_recalculates_total_price(self):
+        self.register_order([
+            {'product': self.products[0].id, 'quantity': 2},
+            {'product': self.products[1].id, 'quantity': 1},
+        ])
+        order = Order.objects.get()
+        first_element, second_element = order.elements.order_by('id')
+        self.client.force_login(
+            User.objects.create(
+                username='admin',
+                is_staff=True,
+                is_superuser=True
+            )
+        )
+        response = self.client.post(
+            reverse('admin:foodcartapp_order_change', args=[order.id]),
+            {
+                'firstname': order.firstname,
+                'lastname': order.lastname,
+                'phonenumber': str(order.phonenumber),
+                'address': order.address,
+                'status': order.status,
+                'payment': order.payment,
+                'comment': '',
+                'created_time_0': order.created_time.strftime('%Y-%m-%d'),
+                'created_time_1': order.created_time.strftime('%H:%M:%S'),
+                'elements-TOTAL_FORMS': 2,
+                'elements-INITIAL_FORMS': 2,
+                'elements-0-id': first_element.id,
+                'elements-0-order': order.id,
+                'elements-0-quantity': 5,
+                'elements-1-id': second_element.id,
+                'elements-1-order': order.id,
+                'elements-1-DELETE': 'on',
+                'elements-1-quantity': 1,
+            }
+        )
+        self.assertEqual(response.status_code, 302)
+        order.refresh_from_db()
+        self.assertEqual(order.total_price, 100 * 5)
+
+    def test_total_price_backfill(self):
+        self.register_order([
+            {'product': self.products[0].id, 'quantity': 3},
+        ])
+        empty_order = Order.objects.create(
+            firstname='Пётр',
+            phonenumber='+79001234568',
+            address='Москва, Арбат 1'
+        )
+        Order.objects.update(total_price=0)
+
+        import_module(
+            'foodcartapp.migrations.0056_order_total_price'
+        ).fill_total_price(apps, None)
+
+        self.assertEqual(
+            dict(Order.objects.values_list('id', 'total_price')),
+            {
+                Order.objects.exclude(id=empty_order.id).get().id: 300,
+                empty_order.id: 0,
+            }
+        )
+
+
+class OrderThrottlingTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            name='Бургер',
+            price=100,
+            image='burger.jpg'
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def register_order(self, phonenumber='+79001234567', **headers):
+        return self.client.post(
+            reverse('foodcartapp:register_order'),
+            {
+                'firstname': 'Иван',
+                'lastname': 'Петров',
+                'phonenumber': phonenumber,
+                'address': 'Москва, Тверская 1',
+                'products': [{'product': self.product.id, 'quantity': 1}],
+            },
+            content_type='application/json',
+            **headers
+        )
+
+    def test_ip_limit_ignores_forwarded_for_header(self):
+        for number in range(ORDER_API_IP_BURST):
+            response = self.register_order(
+                phonenumber=f'+7900123{number:04d}',
+                HTTP_X_FORWARDED_FOR=f'10.0.0.{number}'
+            )
+            self.assertEqual(response.status_code, 201)
+        response = self.register_order(
+            phonenumber='+79009999999',
+            HTTP_X_FORWARDED_FOR='10.0.0.250'
+        )
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('Retry-After', response)
+
+    def test_phone_limit(self):
+        for number in range(ORDER_API_PHONE_BURST):
+            response = self.register_order(REMOTE_ADDR=f'10.0.0.{number}')
+            self.assertEqual(response.status_code, 201)
+        response = self.register_order(REMOTE_ADDR='10.0.0.250')
+        self.assertEqual(response.status_code, 429)
+
+    def test_concurrency_limit(self):
+        slots = {
+            f'concurrency:register-order:{slot}': 'running'
+            for slot in range(ORDER_API_MAX_CONCURRENCY)
+        }
+        cache.set_many(slots)
+        response = self.register_order()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(cache.get_many(slots), slots)
+        self.assertFalse(Order.objects.exists())
+
+    def test_leaked_concurrency_slot_expires(self):
+        @limit_concurrency('leaking-view', limit=1)
+        def view():
+            return 'done'
+
+        acquire_slot(['concurrency:leaking-view:0'])
+        with self.assertRaises(Throttled):
+            view()
+        expired_at = time.time() + CONCURRENCY_SLOT_TIMEOUT + 1
+        with mock.patch('time.time', return_value=expired_at):
+            self.assertEqual(view(), 'done')
+
+    def test_concurrency_slot_is_released_after_exception(self):
+        @limit_concurrency('failing-view', limit=1)
+        def failing_view():
+            raise ValueError
+
+        for _ in range(2):
+            with self.assertRaises(ValueError):
+                failing_view()
+        self.assertIsNone(cache.get('concurrency:failing-view:0'))
+
+
+class NearbyRestaurantsTest(SharedReplicaConnectionMixin, TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_unknown_address_is_queued_instead_of_geocoded(self):
+        with mock.patch('foodcartapp.geo_utils.requests.get') as get:
+            response = self.client.get(
+                reverse('foodcartapp:nearby_restaurants_api'),
+                {'address': 'Москва, Тверская 1'}
+            )
+        get.assert_not_called()
+        self.assertEqual(response.status_code, 202)
+        self.assertIn('Retry-After', response)
+        self.assertTrue(GeocodingTask.objects.exists())
+
+
+class GeocodingTest(TestCase):
+    def test_malformed_geocoder_response_leaves_task_for_retry(self):
+        GeocodingTask.objects.enqueue(['Москва, Тверская 1'])
+        malformed_response = mock.Mock()
+        malformed_response.json.return_value = {'response': {}}
+        with mock.patch(
+            'foodcartapp.geo_utils.requests.Session.get',
+            return_value=malformed_response
+        ):
+            call_command('geocode_worker', once=True)
+        self.assertFalse(Location.objects.exists())
+        task = GeocodingTask.objects.get()
+        self.assertEqual(task.attempts, 1)
+        self.assertGreater(task.scheduled_at, timezone.now())
+
+    def test_worker_skips_addresses_locked_by_another_process(self):
+        GeocodingTask.objects.enqueue(['Москва, Тверская 1'])
+        with geocoding_locks(['москва, тверская 1'], 60), mock.patch(
+            'foodcartapp.geo_utils.requests.Session.get'
+        ) as get:
+            call_command('geocode_worker', once=True)
+        get.assert_not_called()
+        self.assertFalse(Location.objects.exists())
+        self.assertEqual(GeocodingTask.objects.get().attempts, 1)
+
+    def test_geocoding_locks_are_exclusive_until_released(self):
+        with geocoding_locks(['москва, тверская 1'], 60) as locked:
+            self.assertEqual(locked, {'москва, тверская 1'})
+            with geocoding_locks(['москва, тверская 1'], 60) as relocked:
+                self.assertEqual(relocked, set())
+        with geocoding_locks(['москва, тверская 1'], 60) as locked:
+            self.assertEqual(locked, {'москва, тверская 1'})
+
+
+class ProductImageVariantsTest(TestCase):
+    def test_replacing_image_resets_variants(self):
+        product = Product.objects.create(
+            name='Бургер',
+            price=100,
+            image='burger.jpg'
+        )
+        Product.objects.filter(pk=product.pk).update(
+            image_hash='hash',
+            thumbnail='variants/hash_thumbnail.jpg',
+            thumbnail_webp='variants/hash_thumbnail.webp',
+            image_webp='variants/hash.webp'
+        )
+        product.refresh_from_db()
+        product.image = 'new-burger.jpg'
+        with mock.patch(
+            'foodcartapp.signals.generate_image_variants_in_background'
+        ):
+            product.save()
+
+        product.refresh_from_db()
+        self.assertEqual(product.image_hash, '')
+        self.assertFalse(product.thumbnail)
+        self.assertFalse(product.image_webp)
+        self.assertEqual(product.preview_url, product.image.url)
+
+    def test_variants_of_replaced_image_are_not_saved(self):
+        image_content = BytesIO()
+        Image.new('RGB', (10, 10)).save(image_content, 'JPEG')
+        with TemporaryDirectory() as media_root, \
+                override_settings(MEDIA_ROOT=media_root):
+            product = Product.objects.create(
+                name='Бургер',
+                price=100,
+                image=default_storage.save(
+                    'burger.jpg',
+                    ContentFile(image_content.getvalue())
+                )
+            )
+            Product.objects.filter(pk=product.pk).update(
+                image='new-burger.jpg'
+            )
+            self.assertFalse(generate_image_variants(product))
+        product.refresh_from_db()
+        self.assertEqual(product.image_hash, '')
+        self.assertFalse(product.thumbnail)
+
+
+class OrderAdminSearchTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create(
+            username='admin',
+            is_staff=True,
+            is_superuser=True
+        )
+        cls.order = Order.objects.create(
+            firstname='Анна',
+            phonenumber='+79001234567',
+            address='Москва, Тверская 1'
+        )
+        Order.objects.create(
+            firstname='Иван',
+            phonenumber='+79007654321',
+            address='Москва, Арбат 2'
+        )
+
+    def search(self, query):
+        self.client.force_login(self.admin)
+        response = self.client.get(
+            reverse('admin:foodcartapp_order_changelist'),
+            {'q': query}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [order.id for order in response.context['cl'].result_list]
+
+    def test_search_by_firstname_prefix(self):
+        self.assertEqual(self.search('Ан'), [self.order.id])
+        self.assertEqual(self.search('нна'), [])
+
+    def test_search_by_phonenumber(self):
+        self.assertEqual(self.search('8 900 123-45-67'), [self.order.id])
+
+    def test_search_by_address(self):
+        self.assertEqual(self.search('Тверская'), [self.order.id])
+
+
+class ArchiveOrdersTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.product = Product.objects.create(
+            name='Бургер',
+            price=100,
+            image='burger.jpg'
+        )
+
+    def create_order(self, status, days_ago):
+        order = Order.objects.create(
+            firstname='Иван',
+            phonenumber='+79001234567',
+            address='Заказ',
+            status=status,
+            created_time=timezone.now() - timedelta(days=days_ago)
+        )
+        OrderElement.objects.create(
+            order=order,
+            product=self.product,
+            quantity=2,
+            price=self.product.price
+        )
+        return order
+
+    def test_archives_only_old_finished_orders(self):
+        old_order = self.create_order(Order.OrderStatusChoice.DONE, 40)
+        recent_order = self.create_order(Order.OrderStatusChoice.DONE, 1)
+        old_unfinished_order = self.create_order(
+            Order.OrderStatusChoice.CREATED,
+            40
+        )
+        OrderEvent.objects.all().delete()
+
+        with CaptureQueriesContext(connection) as context:
+            call_command('archive_orders', days=30, stdout=StringIO())
+
+        self.assertLess(len(context), 20)
+        self.assertEqual(
+            set(Order.objects.values_list('id', flat=True)),
+            {recent_order.id, old_unfinished_order.id}
+        )
+        self.assertFalse(OrderElement.objects.filter(order=old_order.id))
+        archived_order = ArchivedOrder.objects.get()
+        self.assertEqual(archived_order.id, old_order.id)
+        self.assertEqual(archived_order.firstname, 'Иван')
+        self.assertEqual(
+            list(archived_order.elements.values_list('product', 'quantity')),
+            [(self.product.id, 2)]
+        )
+        self.assertFalse(OrderEvent.objects.exists())
+
+    def test_archiving_unfinished_orders_removes_them_from_board(self):
+        order = self.create_order(Order.OrderStatusChoice.CREATED, 1)
+        OrderEvent.objects.all().delete()
+
+        Order.objects.filter(id=order.id).archive()
+
+        self.assertEqual(
+            list(OrderEvent.objects.values_list('order_id', 'kind')),
+            [(order.id, OrderEvent.KindChoice.DELETED)]
+        )
+
+
+class ProductCatalogApiTest(SharedReplicaConnectionMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        burgers = ProductCategory.objects.create(name='Бургеры')
+        drinks = ProductCategory.objects.create(name='Напитки')
+        cls.restaurant = Restaurant.objects.create(name='Ресторан')
+        other_restaurant = Restaurant.objects.create(name='Другой ресторан')
+        cls.products = [
+            Product.objects.create(
+                name=f'Товар {number}',
+                price=100 + number,
+                image='burger.jpg',
+                category=burgers if number % 2 else drinks,
+                special_status=number == 3
+            ) for number in range(6)
+        ]
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(
+                restaurant=cls.restaurant if number < 4 else other_restaurant,
+                product=product,
+                availability=number != 5
+            ) for number, product in enumerate(cls.products)
+        ])
+        cls.burgers = burgers
+
+    def setUp(self):
+        cache.clear()
+
+    def get_catalog(self, **params):
+        response = self.client.get(
+            reverse('foodcartapp:product_list_api'),
+            params
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def get_ids(self, **params):
+        return [
+            product['id'] for product in
+            self.get_catalog(fields='id', **params)['products']
+        ]
+
+    def test_unknown_params_keep_full_list(self):
+        catalog = self.get_catalog(utm_source='newsletter')
+        self.assertIsInstance(catalog, list)
+        self.assertEqual(len(catalog), 5)
+
+    def test_filters(self):
+        products_ids = [product.id for product in self.products]
+        self.assertEqual(
+            self.get_ids(category=self.burgers.id),
+            [products_ids[1], products_ids[3]]
+        )
+        self.assertEqual(
+            self.get_ids(restaurant=self.restaurant.id),
+            products_ids[:4]
+        )
+        self.assertEqual(
+            self.get_ids(special_status='true'),
+            [products_ids[3]]
+        )
+        self.assertEqual(self.get_ids(), products_ids[:5])
+
+    def test_cursor_round_trip(self):
+        collected_ids = []
+        page = self.get_catalog(fields='id', limit=2)
+        while True:
+            collected_ids.extend(product['id'] for product in page['products'])
+            if not page['next_cursor']:
+                break
+            page = self.get_catalog(
+                fields='id',
+                limit=2,
+                cursor=page['next_cursor']
+            )
+        self.assertEqual(
+            collected_ids,
+            [product.id for product in self.products[:5]]
+        )
+
+    def test_fields_select_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as context:
+            catalog = self.get_catalog(fields='name,price', limit=1)
+        self.assertEqual(
+            catalog['products'],
+            [{'name': 'Товар 0', 'price': '100.00'}]
+        )
+        products_query = next(
+            query['sql'] for query in context.captured_queries
+            if query['sql'].startswith('SELECT')
+            and 'foodcartapp_product' in query['sql']
+        )
+        selected_columns = products_query.split(' FROM ')[0]
+        self.assertIn('"name"', selected_columns)
+        self.assertNotIn('"description"', selected_columns)
+        self.assertNotIn('"image"', selected_columns)
+        self.assertNotIn('productcategory', products_query)
+
+    def test_invalid_params(self):
+        response = self.client.get(
+            reverse('foodcartapp:product_list_api'),
+            {'fields': 'id,secret', 'cursor': '!'}
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(set(response.json()), {'fields', 'cursor'})
+
+
+class CachedJsonResponseTest(SharedReplicaConnectionMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.category = ProductCategory.objects.create(name='Бургеры')
+        cls.product = Product.objects.create(
+            name='Бургер',
+            price=100,
+            image='burger.jpg',
+            category=cls.category
+        )
+        cls.menu_item = RestaurantMenuItem.objects.create(
+            restaurant=Restaurant.objects.create(name='Ресторан'),
+            product=cls.product
+        )
+        cls.banner = Banner.objects.create(title='Акция', image='banner.jpg')
+
+    def setUp(self):
+        cache.clear()
+
+    def get_etag(self, url_name):
+        url = reverse(f'foodcartapp:{url_name}')
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        not_modified_response = self.client.get(
+            url,
+            HTTP_IF_NONE_MATCH=etag
+        )
+        self.assertEqual(not_modified_response.status_code, 304)
+        self.assertEqual(not_modified_response.content, b'')
+        self.assertEqual(not_modified_response['ETag'], etag)
+        return etag
+
+    def test_products_etag_changes_after_catalog_changes(self):
+        etags = [self.get_etag('product_list_api')]
+
+        self.product.name = 'Чизбургер'
+        self.product.save()
+        etags.append(self.get_etag('product_list_api'))
+
+        self.category.name = 'Бургеры и роллы'
+        self.category.save()
+        etags.append(self.get_etag('product_list_api'))
+
+        self.menu_item.availability = False
+        self.menu_item.save()
+        etags.append(self.get_etag('product_list_api'))
+
+        self.assertEqual(len(set(etags)), 4)
+
+    def test_banners_etag_and_cache_control(self):
+        etag = self.get_etag('banners_list_api')
+        response = self.client.get(reverse('foodcartapp:banners_list_api'))
+        self.assertIn('public', response['Cache-Control'])
+        self.assertIn(
+            f'max-age={BANNERS_CACHE_MAX_AGE}',
+            response['Cache-Control']
+        )
+
+        self.banner.title = 'Новая акция'
+        self.banner.save()
+        self.assertNotEqual(self.get_etag('banners_list_api'), etag)
+
+
+class MetricsViewTest(TestCase):
+    def test_hidden_without_token(self):
+        with mock.patch('star_burger.metrics.METRICS_TOKEN', ''):
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 404)
+
+    def test_requires_token(self):
+        with mock.patch('star_burger.metrics.METRICS_TOKEN', 'secret'):
+            forbidden_response = self.client.get('/metrics')
+            response = self.client.get(
+                '/metrics',
+                HTTP_AUTHORIZATION='Bearer secret'
+            )
+        self.assertEqual(forbidden_response.status_code, 403)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'starburger_http_requests_total', response.content)
+
+
+class ProductSearchApiTest(SharedReplicaConnectionMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        restaurant = Restaurant.objects.create(name='Ресторан')
+        burgers = ProductCategory.objects.create(name='Бургеры')
+        cls.cheeseburger = Product.objects.create(
+            name='Чизбургер',
+            price=100,
+            image='burger.jpg',
+            category=burgers
+        )
+        cls.chicken_burger = Product.objects.create(
+            name='Бургер с курицей',
+            price=150,
+            image='burger.jpg',
+            category=burgers
+        )
+        cls.salad = Product.objects.create(
+            name='Салат',
+            price=120,
+            image='salad.jpg',
+            description='С курицей и сыром, как в бургере'
+        )
+        cls.hidden_burger = Product.objects.create(
+            name='Бургер дня',
+            price=90,
+            image='burger.jpg'
+        )
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(
+                restaurant=restaurant,
+                product=product,
+                availability=product != cls.hidden_burger
+            ) for product in (
+                cls.cheeseburger,
+                cls.chicken_burger,
+                cls.salad,
+                cls.hidden_burger
+            )
+        ])
+
+    def setUp(self):
+        cache.clear()
+
+    def search(self, **params):
+        response = self.client.get(
+            reverse('foodcartapp:product_search_api'),
+            params
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def get_found_ids(self, query):
+        return [product['id'] for product in self.search(q=query)['products']]
+
+    def test_word_forms(self):
+        self.assertEqual(
+            self.get_found_ids('курица'),
+            [self.chicken_burger.id, self.salad.id]
+        )
+
+    def test_typos(self):
+        self.assertEqual(
+            self.get_found_ids('чизбургр'),
+            [self.cheeseburger.id]
+        )
+
+    def test_name_matches_rank_above_description(self):
+        found_ids = self.get_found_ids('бургер')
+        self.assertEqual(found_ids[0], self.chicken_burger.id)
+        self.assertEqual(found_ids[-1], self.salad.id)
+        self.assertNotIn(self.hidden_burger.id, found_ids)
+
+    def test_pagination(self):
+        first_page = self.search(q='курица', page_size=1)
+        second_page = self.search(q='курица', page_size=1, page=2)
+        self.assertEqual(first_page['count'], 2)
+        self.assertEqual(
+            first_page['products'][0]['id'],
+            self.chicken_burger.id
+        )
+        self.assertEqual(second_page['products'][0]['id'], self.salad.id)
+
+    def test_empty_query(self):
+        response = self.client.get(reverse('foodcartapp:product_search_api'))
+        self.assertEqual(response.status_code, 400)
+
+
+@mock.patch.dict(
+    settings.DATABASES,
+    {REPLICA_DB_ALIAS: settings.DATABASES[DEFAULT_DB_ALIAS]}
+)
+class ReplicaRoutingTest(TestCase):
+    def route_request(self, request, view):
+        def get_response(request):
+            middleware.process_view(request, view, (), {})
+            return view(request)
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        return middleware(request)
+
+    def get_read_databases(self, request, pin=False, replica_view=True):
+        read_databases = []
+
+        def view(request):
+            read_databases.append(PrimaryReplicaRouter().db_for_read(Order))
+            if pin:
+                pin_to_primary()
+                read_databases.append(
+                    PrimaryReplicaRouter().db_for_read(Order)
+                )
+            with primary_reads():
+                read_databases.append(
+                    PrimaryReplicaRouter().db_for_read(Order)
+                )
+            read_databases.append(PrimaryReplicaRouter().db_for_read(Order))
+            return HttpResponse()
+
+        if replica_view:
+            view = replica_reads(view)
+        response = self.route_request(request, view)
+        self.assertEqual(
+            PrimaryReplicaRouter().db_for_read(Order),
+            DEFAULT_DB_ALIAS
+        )
+        return read_databases, response
+
+    def test_get_reads_from_replica(self):
+        read_databases, response = self.get_read_databases(
+            RequestFactory().get('/')
+        )
+        self.assertEqual(
+            read_databases,
+            [REPLICA_DB_ALIAS, DEFAULT_DB_ALIAS, REPLICA_DB_ALIAS]
+        )
+        self.assertNotIn(PRIMARY_COOKIE_NAME, response.cookies)
+
+    def test_views_without_replica_reads_use_primary(self):
+        read_databases, _ = self.get_read_databases(
+            RequestFactory().get('/'),
+            replica_view=False
+        )
+        self.assertEqual(read_databases, [DEFAULT_DB_ALIAS] * 3)
+
+    def test_post_pins_next_requests_to_primary(self):
+        read_databases, response = self.get_read_databases(
+            RequestFactory().post('/')
+        )
+        self.assertEqual(read_databases, [DEFAULT_DB_ALIAS] * 3)
+        self.assertIn(PRIMARY_COOKIE_NAME, response.cookies)
+
+        request = RequestFactory().get('/')
+        request.COOKIES[PRIMARY_COOKIE_NAME] = \
+            response.cookies[PRIMARY_COOKIE_NAME].value
+        read_databases, _ = self.get_read_databases(request)
+        self.assertEqual(read_databases, [DEFAULT_DB_ALIAS] * 3)
+
+    def test_pin_to_primary(self):
+        read_databases, _ = self.get_read_databases(
+            RequestFactory().get('/'),
+            pin=True
+        )
+        self.assertEqual(
+            read_databases,
+            [REPLICA_DB_ALIAS] + [DEFAULT_DB_ALIAS] * 3
+        )
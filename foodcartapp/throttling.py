@@ -0,0 +1,134 @@
+import math
+import time
+from functools import wraps
+from uuid import uuid4
+
+import phonenumbers
+from django.core.cache import cache
+from rest_framework.exceptions import Throttled
+from rest_framework.throttling import BaseThrottle
+
+from star_burger.settings import (
+    NEARBY_API_IP_BURST,
+    NEARBY_API_IP_RATE,
+    ORDER_API_IP_BURST,
+    ORDER_API_IP_RATE,
+    ORDER_API_MAX_CONCURRENCY,
+    ORDER_API_PHONE_BURST,
+    ORDER_API_PHONE_RATE
+)
+
+
+CONCURRENCY_SLOT_TIMEOUT = 60
+
+
+class TokenBucketThrottle(BaseThrottle):
+    cache_prefix = None
+    rate_per_minute = 0
+    burst = 1
+
+    def get_key(self, request):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        self.retry_after = None
+        key = self.get_key(request)
+        if not self.rate_per_minute or not key:
+            return True
+        cache_key = f'throttle:{self.cache_prefix}:{key}'
+        interval = round(60 * 1000 / self.rate_per_minute)
+        burst_window = interval * self.burst
+        timeout = math.ceil(burst_window / 1000) + 1
+        now = int(time.time() * 1000)
+
+        cache.add(cache_key, now, timeout)
+        try:
+            arrival_time = cache.incr(cache_key, interval)
+        except ValueError:
+            cache.set(cache_key, now + interval, timeout)
+            return True
+        if arrival_time - interval < now:
+            cache.set(cache_key, now + interval, timeout)
+            return True
+        if arrival_time - now > burst_window:
+            cache.decr(cache_key, interval)
+            self.retry_after = (arrival_time - now - burst_window) / 1000
+            return False
+        cache.touch(cache_key, timeout)
+        return True
+
+    def wait(self):
+        return self.retry_after
+
+
+class OrderIpThrottle(TokenBucketThrottle):
+    cache_prefix = 'order-ip'
+    rate_per_minute = ORDER_API_IP_RATE
+    burst = ORDER_API_IP_BURST
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class NearbyRestaurantsIpThrottle(TokenBucketThrottle):
+    cache_prefix = 'nearby-ip'
+    rate_per_minute = NEARBY_API_IP_RATE
+    burst = NEARBY_API_IP_BURST
+
+    def get_key(self, request):
+        return self.get_ident(request)
+
+
+class OrderPhoneThrottle(TokenBucketThrottle):
+    cache_prefix = 'order-phone'
+    rate_per_minute = ORDER_API_PHONE_RATE
+    burst = ORDER_API_PHONE_BURST
+
+    def get_key(self, request):
+        phonenumber = request.data.get('phonenumber')
+        if not isinstance(phonenumber, str):
+            return None
+        try:
+            return phonenumbers.format_number(
+                phonenumbers.parse(phonenumber, 'RU'),
+                phonenumbers.PhoneNumberFormat.E164
+            )
+        except phonenumbers.NumberParseException:
+            return None
+
+
+def limit_concurrency(key, limit=ORDER_API_MAX_CONCURRENCY):
+    slots_keys = [f'concurrency:{key}:{slot}' for slot in range(limit)]
+
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not limit:
+                return view(*args, **kwargs)
+            slot_key, token = acquire_slot(slots_keys)
+            if slot_key is None:
+                raise Throttled(
+                    wait=1,
+                    detail='Сервер перегружен, повторите запрос позже.'
+                )
+            try:
+                return view(*args, **kwargs)
+            finally:
+                release_slot(slot_key, token)
+        return wrapper
+    return decorator
+
+
+def acquire_slot(slots_keys):
+    token = uuid4().hex
+    busy_slots = cache.get_many(slots_keys)
+    for slot_key in slots_keys:
+        if slot_key not in busy_slots \
+                and cache.add(slot_key, token, CONCURRENCY_SLOT_TIMEOUT):
+            return slot_key, token
+    return None, None
+
+
+def release_slot(slot_key, token):
+    if cache.get(slot_key) == token:
+        cache.delete(slot_key)
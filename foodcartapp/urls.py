@@ -1,11 +1,19 @@
 from django.urls import path
 
-from .views import product_list_api, banners_list_api, register_order
+from .views import (
+    banners_list_api,
+    nearby_restaurants_api,
+    product_list_api,
+    product_search_api,
+    register_order
+)
 
 app_name = "foodcartapp"
 
 urlpatterns = [
-    path('products/', product_list_api),
-    path('banners/', banners_list_api),
-    path('order/', register_order),
+    path('products/', product_list_api, name='product_list_api'),
+    path('products/search/', product_search_api, name='product_search_api'),
+    path('banners/', banners_list_api, name='banners_list_api'),
+    path('order/', register_order, name='register_order'),
+    path('restaurants/nearby/', nearby_restaurants_api, name='nearby_restaurants_api'),
 ]
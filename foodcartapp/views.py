@@ -1,67 +1,227 @@
+import hashlib
+import json
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import transaction
-from django.http import JsonResponse
-from django.templatetags.static import static
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse
+from django.utils.cache import patch_cache_control
+from django.utils.encoding import force_bytes
+from django.utils.http import parse_etags, urlsafe_base64_encode
 from rest_framework import status
-from rest_framework.decorators import api_view
+from rest_framework.decorators import api_view, throttle_classes
 from rest_framework.response import Response
 
-from .models import Product
-from .serializers import OrderSerializer
+from .availability import get_availability_index
+from .cache_versions import get_cache_version
+from .models import Banner, Location, Product, Restaurant
+from .product_search import search_products
+from .restaurants_index import get_restaurants_index
+from .serializers import (
+    CATALOG_FIELDS_COLUMNS,
+    NearbyRestaurantsSerializer,
+    OrderSerializer,
+    ProductCatalogSerializer,
+    ProductSearchSerializer
+)
+from .throttling import (
+    NearbyRestaurantsIpThrottle,
+    OrderIpThrottle,
+    OrderPhoneThrottle,
+    limit_concurrency
+)
+from star_burger.db_router import primary_reads, replica_reads
+from star_burger.settings import BANNERS_CACHE_MAX_AGE
 
 
-def banners_list_api(request):
-    # FIXME move data to db?
-    return JsonResponse([
-        {
-            'title': 'Burger',
-            'src': static('burger.jpg'),
-            'text': 'Tasty Burger at your door step',
-        },
-        {
-            'title': 'Spices',
-            'src': static('food.jpg'),
-            'text': 'All Cuisines',
-        },
+JSON_RESPONSE_CACHE_TIMEOUT = 60 * 60 * 24
+NEARBY_GEOCODING_RETRY_AFTER = 5
+CATALOG_IMAGE_FIELDS = {'image', 'image_webp', 'thumbnail', 'thumbnail_webp'}
+CATALOG_QUERY_PARAMS = {
+    'category',
+    'restaurant',
+    'special_status',
+    'cursor',
+    'limit',
+    'fields',
+}
+
+
+def serialize_banners():
+    return [
         {
-            'title': 'New York',
-            'src': static('tasty.jpg'),
-            'text': 'Food is incomplete without a tasty dessert',
-        }
-    ], safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
-    })
+            'title': banner.title,
+            'src': banner.image.url,
+            'text': banner.text,
+        } for banner in Banner.objects.all()
+    ]
 
 
-def product_list_api(request):
+def serialize_products():
     products = Product.objects.select_related('category').available()
+    return [serialize_product(product) for product in products]
 
-    dumped_products = []
-    for product in products:
-        dumped_product = {
-            'id': product.id,
-            'name': product.name,
-            'price': product.price,
-            'special_status': product.special_status,
-            'description': product.description,
-            'category': {
-                'id': product.category.id,
-                'name': product.category.name,
-            } if product.category else None,
-            'image': product.image.url,
-            'restaurant': {
-                'id': product.id,
-                'name': product.name,
-            }
-        }
-        dumped_products.append(dumped_product)
-    return JsonResponse(dumped_products, safe=False, json_dumps_params={
-        'ensure_ascii': False,
-        'indent': 4,
+
+def serialize_product(product):
+    return {
+        'id': product.id,
+        'name': product.name,
+        'price': product.price,
+        'special_status': product.special_status,
+        'description': product.description,
+        'category': {
+            'id': product.category.id,
+            'name': product.category.name,
+        } if product.category else None,
+        'image': product.image.url,
+        'image_webp': product.image_webp.url
+        if product.image_webp else None,
+        'thumbnail': product.thumbnail.url
+        if product.thumbnail else None,
+        'thumbnail_webp': product.thumbnail_webp.url
+        if product.thumbnail_webp else None,
+    }
+
+
+def serialize_catalog_page(query):
+    fields = query.get('fields') or list(CATALOG_FIELDS_COLUMNS)
+    columns = ['id']
+    for field in fields:
+        columns.extend(CATALOG_FIELDS_COLUMNS[field])
+
+    products = Product.objects.order_by('id')
+    if 'restaurant' in query:
+        products = products.filter(
+            menu_items__restaurant=query['restaurant'],
+            menu_items__availability=True
+        )
+    else:
+        products = products.available()
+    if 'category' in query:
+        products = products.filter(category=query['category'])
+    if query['special_status'] is not None:
+        products = products.filter(special_status=query['special_status'])
+    if 'cursor' in query:
+        products = products.filter(id__gt=query['cursor'])
+    products = list(
+        products.values(*dict.fromkeys(columns))[:query['limit'] + 1]
+    )
+
+    next_cursor = None
+    if len(products) > query['limit']:
+        products = products[:query['limit']]
+        next_cursor = urlsafe_base64_encode(force_bytes(products[-1]['id']))
+    return {
+        'products': [
+            {
+                field: serialize_catalog_field(product, field)
+                for field in fields
+            } for product in products
+        ],
+        'next_cursor': next_cursor,
+    }
+
+
+def serialize_catalog_field(product, field):
+    if field == 'category':
+        return {
+            'id': product['category_id'],
+            'name': product['category__name'],
+        } if product['category_id'] else None
+    if field in CATALOG_IMAGE_FIELDS:
+        return default_storage.url(product[field]) if product[field] else None
+    return product[field]
+
+
+def cached_json_response(request, cache_key, serialize, **cache_control):
+    cached_response = cache.get(cache_key)
+    if cached_response is None:
+        with primary_reads():
+            data = serialize()
+        content = json.dumps(
+            data,
+            cls=DjangoJSONEncoder,
+            ensure_ascii=False,
+            separators=(',', ':')
+        ).encode()
+        etag = f'"{hashlib.sha256(content).hexdigest()}"'
+        cached_response = content, etag
+        cache.set(cache_key, cached_response, JSON_RESPONSE_CACHE_TIMEOUT)
+    content, etag = cached_response
+
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match and etag in parse_etags(if_none_match):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type='application/json')
+    response['ETag'] = etag
+    patch_cache_control(response, **(cache_control or {'no_cache': True}))
+    return response
+
+
+@replica_reads
+def banners_list_api(request):
+    return cached_json_response(
+        request,
+        f'banners-list:{get_cache_version("banners")}',
+        serialize_banners,
+        public=True,
+        max_age=BANNERS_CACHE_MAX_AGE
+    )
+
+
+@replica_reads
+def product_list_api(request):
+    if not CATALOG_QUERY_PARAMS.intersection(request.GET):
+        return cached_json_response(
+            request,
+            f'product-list:{get_cache_version("catalog")}',
+            serialize_products
+        )
+    serializer = ProductCatalogSerializer(data=request.GET)
+    if not serializer.is_valid():
+        return JsonResponse(
+            serializer.errors,
+            status=status.HTTP_400_BAD_REQUEST,
+            json_dumps_params={'ensure_ascii': False}
+        )
+    query = serializer.validated_data
+    if 'cursor' in query:
+        return JsonResponse(
+            serialize_catalog_page(query),
+            encoder=DjangoJSONEncoder,
+            json_dumps_params={'ensure_ascii': False}
+        )
+    query_hash = hashlib.sha256(
+        json.dumps(query, sort_keys=True).encode()
+    ).hexdigest()
+    return cached_json_response(
+        request,
+        f'product-catalog:{get_cache_version("catalog")}:{query_hash}',
+        lambda: serialize_catalog_page(query)
+    )
+
+
+@replica_reads
+@api_view(['GET'])
+def product_search_api(request):
+    serializer = ProductSearchSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    query = serializer.validated_data
+    offset = (query['page'] - 1) * query['page_size']
+    count, products = search_products(query['q'], offset, query['page_size'])
+    return Response({
+        'count': count,
+        'page': query['page'],
+        'page_size': query['page_size'],
+        'products': [serialize_product(product) for product in products],
     })
 
 
 @api_view(['POST'])
+@throttle_classes([OrderIpThrottle, OrderPhoneThrottle])
+@limit_concurrency('register-order')
 @transaction.atomic
 def register_order(request):
     serializer = OrderSerializer(data=request.data)
@@ -71,3 +231,50 @@ def register_order(request):
         serializer.data,
         status=status.HTTP_201_CREATED
     )
+
+
+@replica_reads
+@api_view(['GET'])
+@throttle_classes([NearbyRestaurantsIpThrottle])
+def nearby_restaurants_api(request):
+    serializer = NearbyRestaurantsSerializer(data=request.query_params)
+    serializer.is_valid(raise_exception=True)
+    query = serializer.validated_data
+    known_coordinates = Location.objects.known_coordinates([query['address']])
+    if query['address'] not in known_coordinates:
+        return Response(
+            {'error': 'Координаты адреса ещё определяются, '
+                      'повторите запрос позже'},
+            status=status.HTTP_202_ACCEPTED,
+            headers={'Retry-After': str(NEARBY_GEOCODING_RETRY_AFTER)}
+        )
+    coordinates = known_coordinates[query['address']]
+    if not coordinates:
+        return Response(
+            {'error': 'Не удалось определить координаты адреса'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    allowed = None
+    if 'products' in query:
+        allowed = get_availability_index().find_restaurants(query['products'])
+    index = get_restaurants_index()
+    if 'radius' in query:
+        found = index.find_within(coordinates, query['radius'], allowed)
+        found = found[:query['limit']]
+    else:
+        found = index.find_nearest(coordinates, query['limit'], allowed)
+    restaurants = Restaurant.objects.in_bulk(
+        [restaurant_id for restaurant_id, _ in found]
+    )
+    return Response({
+        'restaurants': [
+            {
+                'id': restaurant_id,
+                'name': restaurants[restaurant_id].name,
+                'address': restaurants[restaurant_id].address,
+                'distance': round(distance, 3),
+            }
+            for restaurant_id, distance in found
+            if restaurant_id in restaurants
+        ]
+    })
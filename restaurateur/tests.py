@@ -1,3 +1,142 @@
+import json
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Max
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from foodcartapp.models import (
+    Location,
+    Order,
+    OrderElement,
+    OrderEvent,
+    Product,
+    Restaurant,
+    RestaurantMenuItem
+)
+from star_burger.db_router import SharedReplicaConnectionMixin
+
+
+class OrdersBoardQueriesTest(SharedReplicaConnectionMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create(username='manager', is_staff=True)
+        cls.products = [
+            Product.objects.create(
+                name=f'Бургер {number}',
+                price=100,
+                image='burger.jpg'
+            ) for number in range(3)
+        ]
+        restaurants = [
+            Restaurant.objects.create(
+                name=f'Ресторан {number}',
+                address=f'ресторан {number}'
+            ) for number in range(5)
+        ]
+        RestaurantMenuItem.objects.bulk_create([
+            RestaurantMenuItem(restaurant=restaurant, product=product)
+            for restaurant in restaurants
+            for product in cls.products
+        ])
+        Location.objects.bulk_create([
+            Location(
+                address=restaurant.address,
+                latitude=55.7 + number / 100,
+                longitude=37.6,
+                created_at=timezone.now().date()
+            ) for number, restaurant in enumerate(restaurants)
+        ] + [
+            Location(
+                address='заказ',
+                latitude=55.75,
+                longitude=37.6,
+                created_at=timezone.now().date()
+            )
+        ])
+
+    def create_orders(self, count):
+        Order.objects.bulk_create([
+            Order(
+                firstname='Иван',
+                phonenumber='+79001234567',
+                address='Заказ'
+            ) for _ in range(count)
+        ])
+        orders = Order.objects.order_by('-id')[:count]
+        OrderElement.objects.bulk_create([
+            OrderElement(
+                order=order,
+                product=product,
+                quantity=1,
+                price=product.price
+            )
+            for order in orders
+            for product in self.products
+        ])
+
+    def count_board_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as context:
+            response = self.client.get(reverse('restaurateur:view_orders'))
+        self.assertEqual(response.status_code, 200)
+        return len(context)
+
+    def test_queries_count_does_not_depend_on_orders_count(self):
+        self.client.force_login(self.manager)
+        self.create_orders(10)
+        small_board_queries = self.count_board_queries()
+        self.create_orders(9990)
+        self.assertEqual(self.count_board_queries(), small_board_queries)
+
+
+@mock.patch('restaurateur.views.ORDER_EVENTS_POLL_INTERVAL', 0)
+@mock.patch('restaurateur.views.ORDER_EVENTS_STREAM_DURATION', 0.05)
+class OrdersEventsStreamTest(SharedReplicaConnectionMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create(username='manager', is_staff=True)
+        cls.restaurant = Restaurant.objects.create(name='Ресторан')
+
+    def read_stream(self, last_event_id):
+        response = self.client.get(
+            reverse('restaurateur:orders_events'),
+            {'last_event_id': last_event_id}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode()
+
+    def test_stream_sends_changed_orders_without_changing_them(self):
+        self.client.force_login(self.manager)
+        last_event_id = OrderEvent.objects.aggregate(
+            last_event_id=Max('id')
+        )['last_event_id'] or 0
+        order = Order.objects.create(
+            firstname='Иван',
+            phonenumber='+79001234567',
+            address='Заказ',
+            restaurant=self.restaurant
+        )
+
+        stream = self.read_stream(last_event_id)
+
+        self.assertIn('event: orders', stream)
+        orders_data = json.loads(
+            stream.split('event: orders\ndata: ')[1].split('\n')[0]
+        )
+        self.assertEqual(
+            [changed_order['id'] for changed_order in orders_data['orders']],
+            [order.id]
+        )
+        order.refresh_from_db()
+        self.assertEqual(order.status, Order.OrderStatusChoice.CREATED)
 
-# Create your tests here.
+    def test_stream_requires_event_id(self):
+        self.client.force_login(self.manager)
+        response = self.client.get(reverse('restaurateur:orders_events'))
+        self.assertEqual(response.status_code, 400)
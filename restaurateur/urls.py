@@ -13,6 +13,7 @@ urlpatterns = [
     path('restaurants/', views.view_restaurants, name="RestaurantView"),
 
     path('orders/', views.view_orders, name="view_orders"),
+    path('orders/events/', views.view_orders_events, name="orders_events"),
 
     path('login/', views.LoginView.as_view(), name="login"),
     path('logout/', views.LogoutView.as_view(), name="logout"),
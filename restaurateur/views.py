@@ -1,14 +1,47 @@
-from geopy import distance
+import json
+import time
+from datetime import timedelta
 
+import numpy as np
 from django import forms
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Max, Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import redirect, render
+from django.template.loader import render_to_string
+from django.utils import timezone
 from django.views import View
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib.auth.decorators import user_passes_test
 from django.contrib.auth import authenticate, login
 from django.contrib.auth import views as auth_views
-from foodcartapp.models import Product, Restaurant, Order, RestaurantMenuItem, Location
-from star_burger.settings import YA_API_KEY
+from foodcartapp.availability import get_availability_index
+from foodcartapp.cache_versions import get_cache_version
+from foodcartapp.geo_utils import rank_destinations
+from foodcartapp.models import (
+    Product,
+    Restaurant,
+    RestaurantMenuItem,
+    Order,
+    OrderEvent,
+    Location
+)
+from star_burger.db_router import (
+    pin_to_primary,
+    primary_reads,
+    replica_reads
+)
+from star_burger.settings import (
+    ORDER_BOARD_GEODESIC_TOP_K,
+    ORDER_BOARD_PAGE_SIZE,
+    ORDER_EVENTS_POLL_INTERVAL,
+    ORDER_EVENTS_STREAM_DURATION
+)
+
+
+ORDER_EVENTS_RETRY_DELAY = 3
+ORDER_EVENTS_COMMIT_DELAY = timedelta(seconds=10)
 
 
 class Login(forms.Form):
@@ -28,6 +61,56 @@ class Login(forms.Form):
     )
 
 
+class OrdersFilter(forms.Form):
+    status = forms.ChoiceField(
+        label='Статус',
+        required=False,
+        choices=[('', 'Все')] + [
+            (status, label)
+            for status, label in Order.OrderStatusChoice.choices
+            if status != Order.OrderStatusChoice.DONE
+        ],
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    restaurant = forms.ModelChoiceField(
+        label='Ресторан',
+        required=False,
+        queryset=Restaurant.objects.order_by('name'),
+        empty_label='Все',
+        widget=forms.Select(attrs={'class': 'form-control'})
+    )
+    created_from = forms.DateTimeField(
+        label='Создан с',
+        required=False,
+        widget=forms.DateTimeInput(attrs={
+            'class': 'form-control',
+            'type': 'datetime-local'
+        })
+    )
+    created_till = forms.DateTimeField(
+        label='Создан до',
+        required=False,
+        widget=forms.DateTimeInput(attrs={
+            'class': 'form-control',
+            'type': 'datetime-local'
+        })
+    )
+    after = forms.IntegerField(required=False, widget=forms.HiddenInput)
+    before = forms.IntegerField(required=False, widget=forms.HiddenInput)
+
+    def filter_orders(self, orders):
+        filters = self.cleaned_data
+        if filters.get('status'):
+            orders = orders.filter(status=filters['status'])
+        if filters.get('restaurant'):
+            orders = orders.filter(restaurant=filters['restaurant'])
+        if filters.get('created_from'):
+            orders = orders.filter(created_time__gte=filters['created_from'])
+        if filters.get('created_till'):
+            orders = orders.filter(created_time__lt=filters['created_till'])
+        return orders
+
+
 class LoginView(View):
     def get(self, request, *args, **kwargs):
         form = Login()
@@ -63,89 +146,98 @@ def is_manager(user):
     return user.is_staff  # FIXME replace with specific permission
 
 
-def fetch_restaurant_menu():
-    available_menu = RestaurantMenuItem.objects \
-        .prefetch_related('restaurant', 'product') \
-        .filter(availability=True) \
-        .order_by('product') \
-        .values_list('product', 'restaurant')
-    restaurant_products = {
-            product: set() for product, restaurant in available_menu
-        }
-    for product, restaurant in available_menu:
-        restaurant_products[product].add(restaurant)
-    return restaurant_products
-
-
-def create_order_description(
-    order,
-    restaurant_products,
-    restaurants,
-    order_coordinates,
-    restaurant_coordinates
-    ):
-    orders_to_show_descriptions = {
-        'id': order.id,
-        'status': order.get_status_display(),
-        'payment': order.get_payment_display(),
-        'client': f'{order.firstname} {order.lastname}',
-        'phone': f'+{order.phonenumber.country_code}'
-                 f'{order.phonenumber.national_number}',
-        'address': order.address,
-        'order_price': f'{order.order_price} рублей',
-        'comment': order.comment,
-        'restaurant': order.restaurant,
-    }
-    order_elements = order.elements.select_related('product')
-    if order_elements != 0:
-        suitable_restaurants_ids = set.intersection(
-                *[restaurant_products[order_element.product.id] for order_element in order_elements]
-            )
-        distances = []
-        errors = []
-        if order_coordinates == 'Ошибка':
-            errors = {
+def rank_restaurants(orders, restaurants, availability_index, coordinates):
+    located_restaurants = [
+        restaurant for restaurant in restaurants
+        if coordinates.get(restaurant.address)
+    ]
+    restaurants_ids = np.array(
+        [restaurant.id for restaurant in located_restaurants]
+    )
+    located_orders = []
+    for order in orders:
+        order.distances = []
+        order.errors = []
+        if order.address not in coordinates:
+            order.errors = {
+                'name': 'Координаты адреса ещё определяются'
+            }
+        elif not coordinates[order.address]:
+            order.errors = {
                 'name': 'Ошибка определения координат'
             }
         else:
-            distances = [
-                {
-                    'id': restaurant.id,
-                    'name': restaurant.name,
-                    'distance': distance.distance(
-                        order_coordinates, restaurant_coordinates[restaurant.id]
-                    ).km,
-                } for restaurant in restaurants
-                if restaurant.id in suitable_restaurants_ids
-            ]
-            sorted(
-                distances,
-                key=lambda distance: distance['distance'],
-            )
-        order.distances = distances
-        order.errors = errors
-    return order
+            located_orders.append(order)
+
+    allowed_restaurants = np.array([
+        np.isin(
+            restaurants_ids,
+            list(availability_index.find_restaurants(
+                order_element.product_id
+                for order_element in order.elements.all()
+            ))
+        ) for order in located_orders
+    ]).reshape(len(located_orders), len(located_restaurants))
+    rankings = rank_destinations(
+        [coordinates[order.address] for order in located_orders],
+        [coordinates[restaurant.address] for restaurant in located_restaurants],
+        allowed=allowed_restaurants,
+        geodesic_top_k=ORDER_BOARD_GEODESIC_TOP_K
+    )
+    for order, ranking in zip(located_orders, rankings):
+        order.distances = [
+            {
+                'id': located_restaurants[index].id,
+                'name': located_restaurants[index].name,
+                'distance': restaurant_distance,
+            } for index, restaurant_distance in ranking
+        ]
+    return orders
+
+
+def fetch_products_availability():
+    restaurants = list(Restaurant.objects.order_by('name'))
+    restaurants_positions = {
+        restaurant.id: position
+        for position, restaurant in enumerate(restaurants)
+    }
+    products = list(Product.objects.select_related('category'))
+    products_availability = {
+        product.id: [False] * len(restaurants) for product in products
+    }
+    available_menu = RestaurantMenuItem.objects \
+        .filter(availability=True) \
+        .values_list('product', 'restaurant')
+    for product_id, restaurant_id in available_menu:
+        products_availability[product_id][restaurants_positions[restaurant_id]] = True
+    return restaurants, [
+        (product, products_availability[product.id]) for product in products
+    ]
 
 
+@replica_reads
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_products(request):
-    restaurants = list(Restaurant.objects.order_by('name'))
-    products = list(Product.objects.prefetch_related('menu_items'))
-    products_with_restaurant_availability = []
-    for product in products:
-        availability = {item.restaurant_id: item.availability for item in product.menu_items.all()}
-        ordered_availability = [availability.get(restaurant.id, False) for restaurant in restaurants]
-
-        products_with_restaurant_availability.append(
-            (product, ordered_availability)
-        )
+    cache_key = 'products-availability:' + ':'.join(
+        get_cache_version(name) for name in ('menu', 'catalog', 'restaurants')
+    )
+    products_table = cache.get(cache_key)
+    if products_table is None:
+        with primary_reads():
+            restaurants, products_with_restaurant_availability = \
+                fetch_products_availability()
+        products_table = render_to_string('products_table.html', context={
+            'products_with_restaurant_availability': products_with_restaurant_availability,
+            'restaurants': restaurants,
+        })
+        cache.set(cache_key, products_table, None)
 
     return render(request, template_name="products_list.html", context={
-        'products_with_restaurant_availability': products_with_restaurant_availability,
-        'restaurants': restaurants,
+        'products_table': products_table,
     })
 
 
+@replica_reads
 @user_passes_test(is_manager, login_url='restaurateur:login')
 def view_restaurants(request):
     return render(request, template_name="restaurants_list.html", context={
@@ -153,41 +245,47 @@ def view_restaurants(request):
     })
 
 
-@user_passes_test(is_manager, login_url='restaurateur:login')
-def view_orders(request):
-    restaurants = Restaurant.objects.all()
-    restaurant_products = fetch_restaurant_menu()
-    orders = Order.objects \
-        .count_order_price()
-    known_locations = {
-            'address': (longitude, latitude) \
-                for address, longitude, latitude in
-                Location.objects.values_list(
-                    'address',
-                    'longitude',
-                    'latitude')
-        }
-    restaurants_coordinates = {
-        restaurant.id: known_locations[restaurant.address]
-        if restaurant.address in known_locations.keys()
-        else Location.objects.create_location(restaurant.address)
-        for restaurant in restaurants
-    }
+def start_cooking_assigned_orders():
+    assigned_orders_ids = list(
+        Order.objects.filter(
+            restaurant__isnull=False,
+            status__in=[
+                Order.OrderStatusChoice.CREATED,
+                Order.OrderStatusChoice.ACCEPTED
+            ]
+        ).values_list('id', flat=True)
+    )
+    if not assigned_orders_ids:
+        return
+    with transaction.atomic():
+        started_orders_count = Order.objects.filter(
+            id__in=assigned_orders_ids,
+            status__in=[
+                Order.OrderStatusChoice.CREATED,
+                Order.OrderStatusChoice.ACCEPTED
+            ]
+        ).update(
+            status=Order.OrderStatusChoice.PREPAIRING,
+            updated_at=timezone.now()
+        )
+        OrderEvent.objects.record(
+            assigned_orders_ids,
+            OrderEvent.KindChoice.CHANGED
+        )
+    if started_orders_count:
+        pin_to_primary()
+
+
+def serialize_orders(orders):
+    restaurants = list(Restaurant.objects.all())
+    availability_index = get_availability_index()
+    coordinates = Location.objects.known_coordinates(
+        [restaurant.address for restaurant in restaurants]
+        + [order.address for order in orders]
+    )
+    rank_restaurants(orders, restaurants, availability_index, coordinates)
     orders_to_show = []
     for order in orders:
-        if order.restaurant:
-            order.status = 'P'
-            order.save()
-        order_location = known_locations[order.address] if order.address \
-            in known_locations.keys() \
-            else Location.objects.create_location(order.address)
-        create_order_description(
-            order,
-            restaurant_products,
-            restaurants,
-            order_location,
-            restaurants_coordinates
-        )
         order_to_show = {
             'id': order.id,
             'status': order.get_status_display(),
@@ -196,17 +294,164 @@ def view_orders(request):
             'phone': f'+{order.phonenumber.country_code}'
                      f'{order.phonenumber.national_number}',
             'address': order.address,
-            'order_price': f'{order.order_price} рублей',
+            'order_price': f'{order.total_price} рублей',
             'comment': order.comment,
             'restaurant': order.restaurant,
             'errors': order.errors,
             'restaurants': order.distances
         }
         orders_to_show.append(order_to_show)
+    return orders_to_show
+
+
+def paginate_orders(orders, after=None, before=None):
+    if before:
+        page = list(
+            orders.filter(id__lt=before)
+            .order_by('-id')[:ORDER_BOARD_PAGE_SIZE + 1]
+        )
+        has_previous = len(page) > ORDER_BOARD_PAGE_SIZE
+        return page[:ORDER_BOARD_PAGE_SIZE][::-1], has_previous, True
+    if after:
+        orders = orders.filter(id__gt=after)
+    page = list(orders.order_by('id')[:ORDER_BOARD_PAGE_SIZE + 1])
+    has_next = len(page) > ORDER_BOARD_PAGE_SIZE
+    return page[:ORDER_BOARD_PAGE_SIZE], bool(after), has_next
+
+
+def build_orders_query(request, **params):
+    query = request.GET.copy()
+    query.pop('after', None)
+    query.pop('before', None)
+    for param, value in params.items():
+        query[param] = value
+    return f'?{query.urlencode()}'
+
+
+@replica_reads
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders(request):
+    start_cooking_assigned_orders()
+    last_event_id = OrderEvent.objects.aggregate(
+        last_event_id=Max('id')
+    )['last_event_id'] or 0
+    filter_form = OrdersFilter(request.GET)
+    filter_form.is_valid()
+    orders = filter_form.filter_orders(
+        Order.objects
+        .unfinished()
+        .select_related('restaurant')
+        .prefetch_related('elements')
+    )
+    orders, has_previous, has_next = paginate_orders(
+        orders,
+        after=filter_form.cleaned_data.get('after'),
+        before=filter_form.cleaned_data.get('before')
+    )
+    previous_page_url = next_page_url = None
+    if has_previous:
+        previous_page_url = build_orders_query(request, before=orders[0].id)
+    if has_next:
+        next_page_url = build_orders_query(request, after=orders[-1].id)
+    events_url = reverse('restaurateur:orders_events') \
+        + build_orders_query(request, last_event_id=last_event_id)
     return render(
         request,
         template_name='order_items.html',
         context={
-            'order_items': orders_to_show,
+            'order_items': serialize_orders(orders),
+            'filter_form': filter_form,
+            'previous_page_url': previous_page_url,
+            'next_page_url': next_page_url,
+            'events_url': events_url,
             }
         )
+
+
+def render_orders_changes(request, filter_form, orders_ids):
+    changed_orders = list(
+        Order.objects
+        .select_related('restaurant')
+        .prefetch_related('elements')
+        .filter(id__in=orders_ids)
+        .order_by('id')
+    )
+    visible_orders_ids = set(
+        filter_form.filter_orders(Order.objects.unfinished())
+        .filter(id__in=orders_ids)
+        .values_list('id', flat=True)
+    )
+    visible_orders = [
+        order for order in changed_orders if order.id in visible_orders_ids
+    ]
+    return {
+        'orders': [
+            {
+                'id': order_to_show['id'],
+                'html': render_to_string(
+                    'order_item.html',
+                    {'item': order_to_show},
+                    request
+                ),
+            } for order_to_show in serialize_orders(visible_orders)
+        ],
+        'removed': sorted(set(orders_ids) - visible_orders_ids),
+    }
+
+
+def stream_orders_events(request, filter_form, last_event_id):
+    yield f'retry: {ORDER_EVENTS_RETRY_DELAY * 1000}\n\n'
+    delivered_events = {}
+    deadline = time.monotonic() + ORDER_EVENTS_STREAM_DURATION
+    while time.monotonic() < deadline:
+        late_events_since = timezone.now() - ORDER_EVENTS_COMMIT_DELAY
+        delivered_events = {
+            event_id: created_at
+            for event_id, created_at in delivered_events.items()
+            if created_at >= late_events_since
+        }
+        events = list(
+            OrderEvent.objects
+            .filter(
+                Q(id__gt=last_event_id)
+                | Q(created_at__gte=late_events_since)
+            )
+            .exclude(id__in=delivered_events.keys())
+            .order_by('id')
+            .values_list('id', 'order_id', 'created_at')
+        )
+        if events:
+            changes = render_orders_changes(
+                request,
+                filter_form,
+                {order_id for _, order_id, _ in events}
+            )
+            delivered_events.update(
+                (event_id, created_at) for event_id, _, created_at in events
+            )
+            last_event_id = max(last_event_id, events[-1][0])
+            data = json.dumps(changes, ensure_ascii=False)
+            yield f'id: {last_event_id}\nevent: orders\ndata: {data}\n\n'
+        else:
+            yield ': ping\n\n'
+        time.sleep(ORDER_EVENTS_POLL_INTERVAL)
+
+
+@user_passes_test(is_manager, login_url='restaurateur:login')
+def view_orders_events(request):
+    try:
+        last_event_id = int(
+            request.headers.get('Last-Event-ID')
+            or request.GET['last_event_id']
+        )
+    except (KeyError, ValueError):
+        return JsonResponse({'error': 'Неверный номер события'}, status=400)
+    filter_form = OrdersFilter(request.GET)
+    filter_form.is_valid()
+    response = StreamingHttpResponse(
+        stream_orders_events(request, filter_form, last_event_id),
+        content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
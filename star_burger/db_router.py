@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from star_burger.settings import REPLICA_MAX_LAG_SECONDS
+
+
+REPLICA_DB_ALIAS = 'replica'
+PRIMARY_COOKIE_NAME = 'use_primary_db'
+
+replica_reads_enabled = ContextVar('replica_reads_enabled', default=False)
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if replica_reads_enabled.get():
+            return REPLICA_DB_ALIAS
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+def replica_reads(view):
+    view.replica_reads = True
+    return view
+
+
+def pin_to_primary():
+    replica_reads_enabled.set(False)
+
+
+@contextmanager
+def primary_reads():
+    token = replica_reads_enabled.set(False)
+    try:
+        yield
+    finally:
+        replica_reads_enabled.reset(token)
+
+
+class ReplicaRoutingMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = replica_reads_enabled.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads_enabled.reset(token)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS') \
+                and REPLICA_DB_ALIAS in settings.DATABASES:
+            response.set_cookie(
+                PRIMARY_COOKIE_NAME,
+                '1',
+                max_age=REPLICA_MAX_LAG_SECONDS,
+                httponly=True,
+                samesite='Lax'
+            )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        replica_reads_enabled.set(
+            REPLICA_DB_ALIAS in settings.DATABASES
+            and getattr(view_func, 'replica_reads', False)
+            and request.method in ('GET', 'HEAD')
+            and PRIMARY_COOKIE_NAME not in request.COOKIES
+        )
+
+
+class SharedReplicaConnectionMixin:
+    databases = '__all__'
+
+    @classmethod
+    def setUpClass(cls):
+        if REPLICA_DB_ALIAS in connections:
+            cls.replica_connection = connections[REPLICA_DB_ALIAS]
+            connections[REPLICA_DB_ALIAS] = connections[DEFAULT_DB_ALIAS]
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if REPLICA_DB_ALIAS in connections:
+            connections[REPLICA_DB_ALIAS] = cls.replica_connection
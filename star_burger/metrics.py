@@ -0,0 +1,250 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden, Http404
+from django.utils.crypto import constant_time_compare
+
+from star_burger.settings import METRICS_TOKEN
+
+
+LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10
+)
+QUERIES_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+current_view = ContextVar('current_view', default='background')
+
+
+class Metrics:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.descriptions = {}
+        self.counters = {}
+        self.histograms = {}
+
+    def describe(self, name, metric_type, description):
+        self.descriptions[name] = (metric_type, description)
+
+    def increment(self, name, labels, value=1):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    'buckets': buckets,
+                    'counts': [0] * len(buckets),
+                    'sum': 0,
+                    'count': 0,
+                }
+            bucket = bisect_left(buckets, value)
+            if bucket < len(buckets):
+                histogram['counts'][bucket] += 1
+            histogram['sum'] += value
+            histogram['count'] += 1
+
+    def render(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: dict(histogram, counts=list(histogram['counts']))
+                for key, histogram in self.histograms.items()
+            }
+        lines = []
+        for name, (metric_type, description) in self.descriptions.items():
+            lines.append(f'# HELP {name} {description}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            for (metric_name, labels), value in sorted(counters.items()):
+                if metric_name == name:
+                    lines.append(f'{name}{format_labels(labels)} {value}')
+            for (metric_name, labels), histogram in sorted(histograms.items()):
+                if metric_name != name:
+                    continue
+                cumulative_count = 0
+                for bucket, count in zip(
+                    histogram['buckets'],
+                    histogram['counts']
+                ):
+                    cumulative_count += count
+                    bucket_labels = labels + (('le', f'{bucket:g}'),)
+                    lines.append(
+                        f'{name}_bucket{format_labels(bucket_labels)} '
+                        f'{cumulative_count}'
+                    )
+                bucket_labels = labels + (('le', '+Inf'),)
+                lines.append(
+                    f'{name}_bucket{format_labels(bucket_labels)} '
+                    f'{histogram["count"]}'
+                )
+                lines.append(
+                    f'{name}_sum{format_labels(labels)} {histogram["sum"]}'
+                )
+                lines.append(
+                    f'{name}_count{format_labels(labels)} {histogram["count"]}'
+                )
+        return '\n'.join(lines) + '\n'
+
+
+def format_labels(labels):
+    if not labels:
+        return ''
+    formatted_labels = ','.join(
+        '{}="{}"'.format(
+            label,
+            str(value)
+            .replace('\\', '\\\\')
+            .replace('"', '\\"')
+            .replace('\n', '\\n')
+        )
+        for label, value in labels
+    )
+    return f'{{{formatted_labels}}}'
+
+
+metrics = Metrics()
+metrics.describe(
+    'starburger_http_requests_total',
+    'counter',
+    'HTTP requests by view, method and status code.'
+)
+metrics.describe(
+    'starburger_http_request_duration_seconds',
+    'histogram',
+    'HTTP request latency by view.'
+)
+metrics.describe(
+    'starburger_db_queries_total',
+    'counter',
+    'SQL queries executed while handling requests by view.'
+)
+metrics.describe(
+    'starburger_db_query_duration_seconds_total',
+    'counter',
+    'Time spent in SQL queries while handling requests by view.'
+)
+metrics.describe(
+    'starburger_db_queries_per_request',
+    'histogram',
+    'SQL queries per request by view.'
+)
+metrics.describe(
+    'starburger_geocoder_requests_total',
+    'counter',
+    'Geocoder HTTP requests by view and outcome.'
+)
+metrics.describe(
+    'starburger_geocoder_request_duration_seconds',
+    'histogram',
+    'Geocoder HTTP request latency by view.'
+)
+
+
+def observe_geocoder_request(duration, outcome):
+    view = current_view.get()
+    metrics.increment(
+        'starburger_geocoder_requests_total',
+        {'view': view, 'outcome': outcome}
+    )
+    metrics.observe(
+        'starburger_geocoder_request_duration_seconds',
+        {'view': view},
+        duration
+    )
+
+
+class QueriesCounter:
+    def __init__(self):
+        self.count = 0
+        self.duration = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started_at
+            self.count += 1
+
+
+class MetricsMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        queries_counter = QueriesCounter()
+        view_token = current_view.set('unresolved')
+        started_at = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(queries_counter)
+                    )
+                response = self.get_response(request)
+        finally:
+            current_view.reset(view_token)
+        duration = time.perf_counter() - started_at
+
+        view = get_view_name(request)
+        metrics.increment(
+            'starburger_http_requests_total',
+            {
+                'view': view,
+                'method': request.method,
+                'status': str(response.status_code),
+            }
+        )
+        metrics.observe(
+            'starburger_http_request_duration_seconds',
+            {'view': view},
+            duration
+        )
+        metrics.increment(
+            'starburger_db_queries_total',
+            {'view': view},
+            queries_counter.count
+        )
+        metrics.increment(
+            'starburger_db_query_duration_seconds_total',
+            {'view': view},
+            queries_counter.duration
+        )
+        metrics.observe(
+            'starburger_db_queries_per_request',
+            {'view': view},
+            queries_counter.count,
+            buckets=QUERIES_BUCKETS
+        )
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        current_view.set(get_view_name(request))
+
+
+def get_view_name(request):
+    resolver_match = getattr(request, 'resolver_match', None)
+    if resolver_match is None:
+        return 'unresolved'
+    return resolver_match.view_name
+
+
+def metrics_view(request):
+    if not METRICS_TOKEN:
+        raise Http404
+    if not constant_time_compare(
+        request.headers.get('Authorization', ''),
+        f'Bearer {METRICS_TOKEN}'
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8'
+    )
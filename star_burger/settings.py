@@ -18,6 +18,29 @@ DEBUG = env.bool('DEBUG', True)
 ALLOWED_HOSTS = env.list('ALLOWED_HOSTS', ['127.0.0.1', 'localhost'])
 
 YA_API_KEY = env('YA_API_KEY')
+GEOCODER_CACHE_TTL_DAYS = env.int('GEOCODER_CACHE_TTL_DAYS', 30)
+GEOCODER_NEGATIVE_CACHE_TTL_DAYS = env.int('GEOCODER_NEGATIVE_CACHE_TTL_DAYS', 1)
+GEOCODER_RETRY_DELAY = env.int('GEOCODER_RETRY_DELAY', 30)
+GEOCODER_MAX_RETRY_DELAY = env.int('GEOCODER_MAX_RETRY_DELAY', 3600)
+GEOCODER_MAX_WORKERS = env.int('GEOCODER_MAX_WORKERS', 8)
+GEOCODER_RATE_LIMIT = env.float('GEOCODER_RATE_LIMIT', 10)
+ORDER_BOARD_GEODESIC_TOP_K = env.int('ORDER_BOARD_GEODESIC_TOP_K', 0)
+ORDER_BOARD_PAGE_SIZE = env.int('ORDER_BOARD_PAGE_SIZE', 100)
+ORDER_EVENTS_POLL_INTERVAL = env.float('ORDER_EVENTS_POLL_INTERVAL', 5)
+ORDER_EVENTS_STREAM_DURATION = env.int('ORDER_EVENTS_STREAM_DURATION', 30)
+BANNERS_CACHE_MAX_AGE = env.int('BANNERS_CACHE_MAX_AGE', 60 * 60)
+PRODUCT_THUMBNAIL_SIZE = env.int('PRODUCT_THUMBNAIL_SIZE', 200)
+METRICS_TOKEN = env('METRICS_TOKEN', '')
+ORDER_API_IP_RATE = env.int('ORDER_API_IP_RATE', 30)
+ORDER_API_IP_BURST = env.int('ORDER_API_IP_BURST', 10)
+ORDER_API_PHONE_RATE = env.int('ORDER_API_PHONE_RATE', 3)
+ORDER_API_PHONE_BURST = env.int('ORDER_API_PHONE_BURST', 3)
+ORDER_API_MAX_CONCURRENCY = env.int('ORDER_API_MAX_CONCURRENCY', 20)
+NEARBY_API_IP_RATE = env.int('NEARBY_API_IP_RATE', 60)
+NEARBY_API_IP_BURST = env.int('NEARBY_API_IP_BURST', 20)
+NUM_PROXIES = env.int('NUM_PROXIES', 0)
+REPLICA_DB_URL = env('REPLICA_DB_URL', '')
+REPLICA_MAX_LAG_SECONDS = env.int('REPLICA_MAX_LAG_SECONDS', 5)
 
 
 INSTALLED_APPS = [
@@ -29,12 +52,14 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
-    'debug_toolbar',
+    'django.contrib.postgres',
     'phonenumber_field',
     'rest_framework'
 ]
 
 MIDDLEWARE = [
+    'star_burger.metrics.MetricsMiddleware',
+    'star_burger.db_router.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -42,11 +67,17 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'debug_toolbar.middleware.DebugToolbarMiddleware',
     'rollbar.contrib.django.middleware.RollbarNotifierMiddleware',
     'rollbar.contrib.django.middleware.RollbarNotifierMiddlewareExcluding404'
 ]
 
+if DEBUG:
+    INSTALLED_APPS.append('debug_toolbar')
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index('rollbar.contrib.django.middleware.RollbarNotifierMiddleware'),
+        'debug_toolbar.middleware.DebugToolbarMiddleware'
+    )
+
 ROLLBAR = {
     'access_token': env('ROLLBAR_TOKEN', default=''),
     'environment': env('ROLLBAR_ENVIRONMENT', default='development'),
@@ -97,6 +128,20 @@ MEDIA_URL = '/media/'
 DATABASES = {
     'default': dj_database_url.parse(env('DB_URL')),
 }
+if REPLICA_DB_URL:
+    DATABASES['replica'] = {
+        **dj_database_url.parse(REPLICA_DB_URL),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['star_burger.db_router.PrimaryReplicaRouter']
+
+CACHES = {
+    'default': env.dj_cache_url('CACHE_URL', 'locmem://'),
+}
+
+REST_FRAMEWORK = {
+    'NUM_PROXIES': NUM_PROXIES,
+}
 
 AUTH_PASSWORD_VALIDATORS = [
     {